@@ -0,0 +1,200 @@
+"""
+Offline end-to-end benchmark of GameFlow.
+
+Starts the stub OpenAI/Freesound servers from ``stub_servers`` and runs the
+real flow once per file-plan size, each in a fresh child process and a fresh
+working directory, then reports wall time, peak memory and the concurrency
+that was actually achieved.
+
+Crews, image processing, validation and performance analysis run in spawned
+worker processes, so the "tree MB" column is the peak of the summed RSS of
+the flow process and all its descendants, sampled from /proc while the flow
+runs. The JSON output also has the flow process's own peak (``self_rss_mb``)
+and the largest single worker's (``largest_child_rss_mb``, from
+RUSAGE_CHILDREN).
+
+    python benchmarks/bench_flow.py                     # 10, 100 and 500 files
+    python benchmarks/bench_flow.py --files 50 --chat-latency 0.2 --output bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from stub_servers import StubConfig, StubServers  # noqa: E402
+
+REPO_SRC = Path(__file__).resolve().parent.parent / "src"
+RSS_SAMPLE_SECONDS = 0.2
+
+
+def _tree_rss_bytes(root_pid: int) -> int:
+    """Summed resident set size of ``root_pid`` and all its descendants (Linux /proc)."""
+    total, pending = 0, [root_pid]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f"/proc/{pid}/status", encoding="ascii") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{pid}/task"):
+                with open(f"/proc/{pid}/task/{task}/children", encoding="ascii") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue  # exited between listing and reading
+    return total
+
+
+class TreeRSSSampler:
+    """Background thread that records the peak ``_tree_rss_bytes`` of this process."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, _tree_rss_bytes(os.getpid()))
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self) -> "TreeRSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _child(result_path: str) -> None:
+    """Run one GameFlow in this process and dump its measurements."""
+    import dotenv
+
+    # main.py loads the repo's .env with override=True, which would replace the
+    # stub endpoints and key with a developer's real ones; the benchmark only
+    # ever runs against the environment run_case built
+    dotenv.load_dotenv = lambda *args, **kwargs: False
+    from unemploymentstudios.main import run_game
+
+    started = time.perf_counter()
+    error = None
+    flow = None
+    with TreeRSSSampler() as sampler:
+        try:
+            flow = run_game({
+                "Storyline": "A benchmark hero crosses floating islands",
+                "Game_Mechanics": "Platformer",
+                "Entities": "Hero, slimes",
+                "Levels": "Three short levels",
+                "visualAudioStyle": "Pixel art with chiptune",
+            })
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+
+    state = flow.state if flow is not None else None
+    result = {
+        "wall_seconds": round(wall, 2),
+        "peak_tree_rss_mb": round(sampler.peak / (1024 * 1024), 1),
+        "self_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "largest_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "code_files": len(state.generatedCodeFiles) if state else 0,
+        "images": len(state.generatedImages) if state else 0,
+        "sounds": len(state.generatedSounds) if state else 0,
+        "code_generation": dict(state.codeGenerationSummary) if state else {},
+        "asset_generation": dict(state.assetGenerationSummary) if state else {},
+        "error": error,
+    }
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_case(files: int, config: StubConfig, env_overrides: Dict[str, str]) -> Dict[str, Any]:
+    """Run the flow for one plan size against fresh stub servers."""
+    config.plan_files = files
+    with StubServers(config) as stubs, tempfile.TemporaryDirectory(prefix=f"bench-{files}-") as workdir:
+        result_path = os.path.join(workdir, "result.json")
+        env = {**os.environ, **stubs.env(), **env_overrides}
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_SRC), env.get("PYTHONPATH")]))
+        log_path = os.path.join(workdir, "flow.log")
+        with open(log_path, "w", encoding="utf-8") as log:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", result_path],
+                cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, check=False,
+            )
+        if os.path.exists(result_path):
+            with open(result_path, encoding="utf-8") as f:
+                result = json.load(f)
+        else:
+            with open(log_path, encoding="utf-8") as f:
+                result = {"error": "child crashed: " + f.read()[-2000:]}
+        result["files"] = files
+        result["stub_peak_in_flight"] = stubs.stats.peak_in_flight
+        result["stub_requests"] = dict(stubs.stats.requests)
+    return result
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'files':>6} {'wall s':>8} {'tree MB':>8} {'generated':>9} {'avg par':>8} {'peak':>5} {'stub peak':>9} {'1st play s':>10}  error")
+    for r in results:
+        codegen = r.get("code_generation") or {}
+        assets = r.get("asset_generation") or {}
+        print(f"{r['files']:>6} {r.get('wall_seconds', 0):>8.1f} {r.get('peak_tree_rss_mb', 0):>8.1f} "
+              f"{r.get('code_files', 0):>9} {codegen.get('avg_parallelism', 0):>8.2f} "
+              f"{codegen.get('peak_in_flight', 0):>5} {r.get('stub_peak_in_flight', 0):>9} "
+              f"{assets.get('first_playable_seconds', 0):>10.2f}  {r.get('error') or ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 100, 500], help="file-plan sizes to run")
+    parser.add_argument("--chat-latency", type=float, default=StubConfig.chat_latency)
+    parser.add_argument("--image-latency", type=float, default=StubConfig.image_latency)
+    parser.add_argument("--sound-latency", type=float, default=StubConfig.sound_latency)
+    parser.add_argument("--code-bytes", type=int, default=StubConfig.code_bytes)
+    parser.add_argument("--image-bytes", type=int, default=StubConfig.image_bytes)
+    parser.add_argument("--sound-bytes", type=int, default=StubConfig.sound_bytes)
+    parser.add_argument("--max-concurrent-files", type=int, default=None,
+                        help="override MAX_CONCURRENT_FILES for the flow")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="keep the LLM response cache on (off by default so runs measure scheduling)")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child)
+        return
+
+    config = StubConfig(
+        chat_latency=args.chat_latency, image_latency=args.image_latency, sound_latency=args.sound_latency,
+        code_bytes=args.code_bytes, image_bytes=args.image_bytes, sound_bytes=args.sound_bytes,
+    )
+    env_overrides = {"LLM_CACHE_MODE": "readwrite" if args.llm_cache else "off"}
+    if args.max_concurrent_files:
+        env_overrides["MAX_CONCURRENT_FILES"] = str(args.max_concurrent_files)
+
+    results = []
+    for files in args.files:
+        print(f"Running GameFlow against stubs with a {files}-file plan...")
+        results.append(run_case(files, config, env_overrides))
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
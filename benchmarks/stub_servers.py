@@ -0,0 +1,265 @@
+"""
+Local stand-ins for the OpenAI chat/images APIs and the Freesound API.
+
+The chat endpoint answers every agent turn with a crewAI-style
+``Final Answer``; prompts that ask for a ``GameConcept`` or a
+``FileStructureSpec`` or an ``AssetManifest`` get valid JSON for those models, with a file plan of
+``plan_files`` files. Images and sound previews are served as generated
+bytes of the configured size. Every endpoint sleeps for its configured
+latency and the server tracks peak concurrent requests.
+"""
+import base64
+import json
+import struct
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class StubConfig:
+    plan_files: int = 10
+    chat_latency: float = 0.05
+    image_latency: float = 0.2
+    sound_latency: float = 0.1
+    code_bytes: int = 2_000
+    image_bytes: int = 200_000
+    sound_bytes: int = 100_000
+    image_response_format: str = "url"
+
+
+@dataclass
+class StubStats:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    requests: Dict[str, int] = field(default_factory=dict)
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+    def enter(self, endpoint: str) -> None:
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+
+def make_png(size_bytes: int) -> bytes:
+    """A valid 1x1 PNG padded with an ancillary chunk to roughly ``size_bytes``."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0))
+    pixels = chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00\xff"))
+    padding = chunk(b"stUb", b"\x00" * max(0, size_bytes - 69))
+    return b"\x89PNG\r\n\x1a\n" + header + padding + pixels + chunk(b"IEND", b"")
+
+
+def game_concept(title: str = "Stub Quest") -> Dict[str, Any]:
+    character = {"name": "Hero", "role": "Protagonist", "description": "A brave hero",
+                 "abilities": ["jump", "dash"], "emotional_arc": "doubt to courage"}
+    return {
+        "title": title,
+        "tagline": "A benchmark adventure",
+        "overview": "A platformer generated against stub servers.",
+        "main_character": character,
+        "supporting_characters": [{**character, "name": "Guide", "role": "Supporting"}],
+        "world_building": "A floating archipelago.",
+        "levels": [
+            {"name": f"Level {i}", "description": "Jump across islands", "difficulty": "Easy",
+             "key_objectives": ["reach the exit"], "enemies_obstacles": ["slimes"],
+             "boss_battle": None}
+            for i in range(1, 4)
+        ],
+        "gameplay_mechanics": ["jumping", "collecting"],
+        "visual_style": "Pixel art",
+        "audio_style": "Chiptune",
+        "emotional_arc": "Growth through adversity",
+        "conclusion": "The hero returns home.",
+    }
+
+
+def asset_manifest(images: int = 5, sounds: int = 3) -> Dict[str, Any]:
+    return {
+        "image_jobs": [{"name": f"image_{i}", "prompt": f"Stub image {i}, pixel art", "size": "1024x1024",
+                        "category": ["main_character", "ui", "level"][i] if i < 3 else "decorative",
+                        "level": 1 if i == 2 else None, "purpose": "benchmark"} for i in range(images)],
+        "audio_jobs": [{"name": f"sound_{i}", "query": f"stub sound {i}", "kind": "sfx"} for i in range(sounds)],
+    }
+
+
+def file_plan(count: int) -> Dict[str, Any]:
+    """
+    ``count`` files: index.html -> js/main.js -> modules laid out in layers of
+    eight, where each module depends on two modules of the previous layer.
+    """
+    modules = max(0, count - 2)
+    files: List[Dict[str, Any]] = [
+        {"filename": "index.html", "purpose": "Entry page", "content_guidelines": "Load main.js",
+         "dependencies": ["js/main.js"]},
+        {"filename": "js/main.js", "purpose": "Bootstrap", "content_guidelines": "Start the loop",
+         "dependencies": [f"js/module_{i}.js" for i in range(max(0, modules - 4), modules)]},
+    ]
+    for i in range(modules):
+        deps = [f"js/module_{j}.js" for j in (i - 8, i - 7) if j >= 0 and j // 8 == i // 8 - 1]
+        files.append({"filename": f"js/module_{i}.js", "purpose": f"Module {i}",
+                      "content_guidelines": "Export one class", "dependencies": deps})
+    return {"files": files[:max(1, count)]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config: StubConfig = StubConfig()
+    stats: StubStats = StubStats()
+    base_url: str = ""
+
+    def log_message(self, format: str, *args: Any) -> None:  # keep benchmark output clean
+        pass
+
+    # ------------------------------------------------------------------
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, payload: Any, status: int = 200) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", "0") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # ------------------------------------------------------------------
+    def do_POST(self) -> None:
+        path = urlparse(self.path).path
+        if path.endswith("/chat/completions"):
+            self._handle(path, self._chat)
+        elif path.endswith("/images/generations"):
+            self._handle(path, self._images)
+        else:
+            self._json({"error": {"message": f"no stub for {path}"}}, 404)
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path.startswith("/apiv2/search/text"):
+            self._handle(path, self._freesound_search)
+        elif path.startswith("/files/img/"):
+            self._handle("/files/img", lambda: self._send(200, make_png(self.config.image_bytes), "image/png"))
+        elif path.startswith("/files/snd/"):
+            self._handle("/files/snd", lambda: self._send(200, b"ID3" + b"\x00" * self.config.sound_bytes, "audio/mpeg"))
+        elif "/models" in path:
+            self._handle("/models", lambda: self._json({"id": path.rsplit("/", 1)[-1], "object": "model", "owned_by": "stub"}))
+        else:
+            self._json({"error": {"message": f"no stub for {path}"}}, 404)
+
+    do_HEAD = do_GET
+
+    def _handle(self, endpoint: str, fn) -> None:
+        self.stats.enter(endpoint)
+        try:
+            fn()
+        finally:
+            self.stats.leave()
+
+    # ------------------------------------------------------------------
+    def _chat(self) -> None:
+        body = self._read_json()
+        time.sleep(self.config.chat_latency)
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+
+        if '"content_guidelines"' in prompt and '"files"' in prompt:
+            payload: Optional[Dict[str, Any]] = file_plan(self.config.plan_files)
+        elif '"image_jobs"' in prompt and '"audio_jobs"' in prompt:
+            payload = asset_manifest()
+        elif '"gameplay_mechanics"' in prompt and '"main_character"' in prompt:
+            payload = game_concept()
+        else:
+            payload = None
+
+        if payload is not None and body.get("tools"):
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                "function": {"name": body["tools"][0]["function"]["name"], "arguments": json.dumps(payload)},
+            }]}
+        elif payload is not None:
+            message = {"role": "assistant", "content": "Thought: I now know the final answer\nFinal Answer: " + json.dumps(payload)}
+        else:
+            filler = "// stub output\n" + "x = 1;\n" * max(1, self.config.code_bytes // 7)
+            message = {"role": "assistant", "content": "Thought: I now know the final answer\nFinal Answer: " + filler}
+
+        self._json({
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(str(message.get("content"))) // 4,
+                      "total_tokens": (len(prompt) + len(str(message.get("content")))) // 4},
+        })
+
+    def _images(self) -> None:
+        body = self._read_json()
+        time.sleep(self.config.image_latency)
+        if body.get("response_format", self.config.image_response_format) == "b64_json":
+            item = {"b64_json": base64.b64encode(make_png(self.config.image_bytes)).decode("ascii")}
+        else:
+            item = {"url": f"{self.base_url}/files/img/{uuid.uuid4().hex}.png"}
+        self._json({"created": int(time.time()), "data": [item]})
+
+    def _freesound_search(self) -> None:
+        query = parse_qs(urlparse(self.path).query)
+        time.sleep(self.config.sound_latency)
+        page_size = int(query.get("page_size", ["5"])[0])
+        results = []
+        for i in range(page_size):
+            preview = f"{self.base_url}/files/snd/{uuid.uuid4().hex}.mp3"
+            results.append({
+                "id": 1000 + i, "name": f"{query.get('query', ['sound'])[0]} {i}",
+                "url": f"{self.base_url}/sounds/{1000 + i}/",
+                "duration": 1.0 + i, "filesize": self.config.sound_bytes,
+                "previews": {"preview-hq-mp3": preview, "preview-lq-mp3": preview},
+            })
+        self._json({"count": len(results), "next": None, "previous": None, "results": results})
+
+
+class StubServers:
+    """Run the stub API on a background thread: ``with StubServers(config) as stubs: ...``."""
+
+    def __init__(self, config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+        self.stats = StubStats()
+        handler = type("BoundStubHandler", (StubHandler,), {"config": config, "stats": self.stats})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        handler.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self.base_url = handler.base_url
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def env(self) -> Dict[str, str]:
+        """Environment that points the flow's clients at this server."""
+        return {
+            "OPENAI_API_KEY": "sk-stub",
+            "OPENAI_API_BASE": f"{self.base_url}/v1",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "FREESOUND_API_KEY": "stub",
+            "FREESOUND_API_BASE": f"{self.base_url}/apiv2",
+            "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+            "OTEL_SDK_DISABLED": "true",
+            "CREWAI_DISABLE_TELEMETRY": "true",
+        }
+
+    def __enter__(self) -> "StubServers":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
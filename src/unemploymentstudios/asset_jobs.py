@@ -0,0 +1,310 @@
+"""
+Manifest-driven asset production.
+
+``AssetGenerationCrew`` ends its planning with a pydantic ``AssetManifest``
+of image and audio jobs. ``run_manifest`` executes those jobs directly
+through the asset tools' async entry points, outside the agent loop, with a
+fixed number of workers per provider, so asset throughput is set by provider
+limits rather than by how quickly an agent decides to call a tool.
+
+Workers take jobs from a priority queue ordered by ``job_priority``, which
+places each job against the ``GameConcept``: the main character and core UI
+first, then the first level, then later levels in order, then decorative
+assets. The time until the first playable set (main character, core UI and
+first level) is on disk is reported. Once ASSET_TIME_BUDGET_SECONDS has
+passed, jobs still queued outside that set are skipped, so a budget only
+ever cuts the low-priority tail.
+
+Files land where the tool-calling agents used to put them
+(``./assets/images/<name>.png`` and ``./assets/audio/<name>.mp3``), together
+with ``manifest_images.json`` / ``manifest_audio.json``.
+
+Settings (environment):
+    ASSET_IMAGE_CONCURRENCY   DALL·E jobs in flight at once (default 4)
+    ASSET_AUDIO_CONCURRENCY   Freesound jobs in flight at once (default 4)
+    ASSET_TIME_BUDGET_SECONDS stop starting low-priority jobs after this long (default 0: no budget)
+"""
+import asyncio
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
+
+from unemploymentstudios.checkpoint import atomic_write_text
+from unemploymentstudios.crews.asset_generation_crew.asset_generation_crew import (
+    GenerateAndDownloadImageTool,
+    SearchAndSaveSoundTool,
+    run_coroutine,
+)
+from unemploymentstudios.metrics import metrics
+from unemploymentstudios.types import AssetManifest, AudioJob, GameConcept, ImageJob
+
+IMAGE_DIR = "./assets/images"
+AUDIO_DIR = "./assets/audio"
+ASSET_IMAGE_CONCURRENCY = int(os.getenv("ASSET_IMAGE_CONCURRENCY", "4"))
+ASSET_AUDIO_CONCURRENCY = int(os.getenv("ASSET_AUDIO_CONCURRENCY", "4"))
+ASSET_TIME_BUDGET_SECONDS = float(os.getenv("ASSET_TIME_BUDGET_SECONDS", "0"))
+
+# Priority tiers, most urgent first; tiers up to FIRST_PLAYABLE make up the
+# first playable asset set and are never skipped for the time budget
+MAIN_CHARACTER, FIRST_LEVEL, LATER_LEVELS, DECORATIVE = range(4)
+FIRST_PLAYABLE = FIRST_LEVEL
+
+# Produced when the crew does not return a usable manifest
+DEFAULT_MANIFEST = AssetManifest(
+    image_jobs=[
+        ImageJob(name="main_character", category="main_character", prompt="A hero character for a video game with determined expression, detailed pixel art style"),
+        ImageJob(name="enemy", category="character", level=1, prompt="A menacing enemy character for a video game, detailed pixel art style"),
+        ImageJob(name="background", category="level", level=1, prompt="A beautiful game background landscape, pixel art style"),
+        ImageJob(name="ui_button", category="ui", prompt="A stylish game UI button in pixel art style"),
+        ImageJob(name="logo", prompt="A game logo with stylized text, pixel art style"),
+    ],
+    audio_jobs=[
+        AudioJob(name="background_music", query="game background music", kind="music", category="level", level=1),
+        AudioJob(name="jump_sound", query="game jump sound effect", category="main_character"),
+        AudioJob(name="collect_item", query="game collect item sound", category="level", level=1),
+    ],
+)
+
+Job = TypeVar("Job", ImageJob, AudioJob)
+
+
+class JobResult(NamedTuple):
+    provider: str  # "openai" or "freesound"
+    name: str
+    file: str
+    ok: bool
+    detail: Dict[str, Any]  # tool result, or {"error": ...}; skipped jobs add "skipped": True
+    seconds: float
+    priority: int = DECORATIVE
+
+
+class ManifestRun(NamedTuple):
+    results: List[JobResult]
+    summary: Dict[str, float]
+
+
+def safe_name(name: str) -> str:
+    """A job name as a file stem: lower-case letters, digits and underscores."""
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_") or "asset"
+
+
+def unique_jobs(jobs: List[Job]) -> List[Job]:
+    """Drop jobs whose file name repeats an earlier job's; the first one wins."""
+    seen = set()
+    unique = []
+    for job in jobs:
+        stem = safe_name(job.name)
+        if stem not in seen:
+            seen.add(stem)
+            unique.append(job)
+    return unique
+
+
+def image_path(job: ImageJob) -> str:
+    return os.path.join(IMAGE_DIR, f"{safe_name(job.name)}.png")
+
+
+def audio_path(job: AudioJob) -> str:
+    return os.path.join(AUDIO_DIR, f"{safe_name(job.name)}.mp3")
+
+
+def job_priority(job: Job, concept: Optional[GameConcept] = None) -> Tuple[int, int]:
+    """
+    ``(tier, level)`` sort key for a job; lower runs first. The job's own
+    category and level are used where given, and the concept's main
+    character and level names are matched against its name and description
+    otherwise.
+    """
+    text = " ".join([job.name, getattr(job, "prompt", None) or getattr(job, "query", ""),
+                     getattr(job, "purpose", None) or ""]).replace("_", " ").casefold()
+    level = job.level
+    if concept is not None and level is None:
+        level = next((number for number, candidate in enumerate(concept.levels, 1)
+                      if candidate.name.casefold() in text), None)
+
+    if job.category in ("main_character", "ui"):
+        return MAIN_CHARACTER, 0
+    if concept is not None and concept.main_character.name.casefold() in text:
+        return MAIN_CHARACTER, 0
+    if level == 1:
+        return FIRST_LEVEL, 1
+    if level is not None:
+        return LATER_LEVELS, level
+    if job.category in ("level", "character"):
+        return LATER_LEVELS, sys.maxsize  # after every numbered level
+    return DECORATIVE, 0
+
+
+def manifest_from_output(output: Any) -> Optional[AssetManifest]:
+    """The manifest planned by a finished AssetGenerationCrew, if any."""
+    for task_output in getattr(output, "tasks_output", None) or []:
+        if isinstance(task_output.pydantic, AssetManifest):
+            return task_output.pydantic
+        if task_output.name == "plan_asset_jobs":
+            try:
+                return AssetManifest.model_validate_json(task_output.raw)
+            except ValueError:
+                return None
+    return None
+
+
+# ---------------------------------------------------------------------------
+#  Worker pool
+# ---------------------------------------------------------------------------
+def _detail(raw: Any) -> Dict[str, Any]:
+    """Tool results are JSON on success; plain strings are error messages."""
+    try:
+        detail = json.loads(raw)
+    except (TypeError, ValueError):
+        return {"error": str(raw)}
+    return detail if isinstance(detail, dict) else {"error": str(raw)}
+
+
+async def _run_job(provider: str, name: str, file: str, priority: int, call: Callable[[], Awaitable[Any]]) -> JobResult:
+    with metrics.span("asset_job", name, provider=provider, priority=priority) as span:
+        try:
+            detail = _detail(await call())
+        except Exception as e:
+            detail = {"error": f"{type(e).__name__}: {e}"}
+        if "error" in detail:
+            span["status"] = "error"
+    return JobResult(provider, name, file, "error" not in detail, detail, span["wall_seconds"], priority)
+
+
+async def arun_manifest(
+    manifest: AssetManifest,
+    concept: Optional[GameConcept] = None,
+    image_concurrency: Optional[int] = None,
+    audio_concurrency: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
+) -> ManifestRun:
+    """Run the jobs in ``manifest`` in priority order; results come back in manifest order."""
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    image_tool = GenerateAndDownloadImageTool()
+    audio_tool = SearchAndSaveSoundTool()
+
+    # One heap per provider of (priority, manifest position, job)
+    queues: Dict[str, List[Tuple[Tuple[int, int], int, str, str, Callable[[], Awaitable[Any]]]]] = {
+        "openai": [], "freesound": [],
+    }
+    for job in unique_jobs(manifest.image_jobs):
+        file = image_path(job)
+        queues["openai"].append((job_priority(job, concept), len(queues["openai"]) + len(queues["freesound"]),
+                                 job.name, file, lambda job=job, file=file: image_tool._arun(
+                                     prompt=job.prompt, file_name=file, size=job.size)))
+    for job in unique_jobs(manifest.audio_jobs):
+        file = audio_path(job)
+        queues["freesound"].append((job_priority(job, concept), len(queues["openai"]) + len(queues["freesound"]),
+                                    job.name, file, lambda job=job, file=file: audio_tool._arun(
+                                        query=job.query, output_path=file,
+                                        min_duration=job.min_duration, max_duration=job.max_duration)))
+    for queue in queues.values():
+        heapq.heapify(queue)
+
+    started = time.perf_counter()
+    budget = ASSET_TIME_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    deadline = started + budget if budget > 0 else None
+    first_playable = {entry[1] for queue in queues.values() for entry in queue if entry[0][0] <= FIRST_PLAYABLE}
+    pending_first_playable = set(first_playable)
+    first_playable_seconds = 0.0
+    results: Dict[int, JobResult] = {}
+
+    async def worker(provider: str) -> None:
+        nonlocal first_playable_seconds
+        queue = queues[provider]
+        while queue:
+            (tier, _), position, name, file, call = heapq.heappop(queue)
+            if deadline is not None and tier > FIRST_PLAYABLE and time.perf_counter() > deadline:
+                metrics.record("asset_job", name, provider=provider, priority=tier, status="skipped")
+                results[position] = JobResult(provider, name, file, False,
+                                              {"error": "skipped: asset time budget exhausted", "skipped": True},
+                                              0.0, tier)
+                continue
+            results[position] = await _run_job(provider, name, file, tier, call)
+            if position in pending_first_playable:
+                pending_first_playable.discard(position)
+                if not pending_first_playable:
+                    first_playable_seconds = time.perf_counter() - started
+
+    workers = [worker("openai") for _ in range(max(1, image_concurrency or ASSET_IMAGE_CONCURRENCY))]
+    workers += [worker("freesound") for _ in range(max(1, audio_concurrency or ASSET_AUDIO_CONCURRENCY))]
+    await asyncio.gather(*workers)
+
+    ordered = [results[position] for position in sorted(results)]
+    summary = {
+        "jobs": len(ordered),
+        "succeeded": sum(result.ok for result in ordered),
+        "skipped": sum(bool(result.detail.get("skipped")) for result in ordered),
+        "failed": sum(not result.ok and not result.detail.get("skipped") for result in ordered),
+        "first_playable_jobs": len(first_playable),
+        "first_playable_ready": sum(results[position].ok for position in first_playable),
+        "first_playable_seconds": round(first_playable_seconds, 2),
+        "wall_seconds": round(time.perf_counter() - started, 2),
+    }
+    metrics.record("asset_manifest", "first_playable", wall_seconds=summary["first_playable_seconds"],
+                   jobs=summary["first_playable_jobs"], ready=summary["first_playable_ready"])
+    return ManifestRun(ordered, summary)
+
+
+def format_manifest_summary(summary: Dict[str, float]) -> str:
+    return (
+        f"{summary['succeeded']}/{summary['jobs']} asset jobs succeeded "
+        f"({summary['failed']} failed, {summary['skipped']} skipped for the time budget) "
+        f"in {summary['wall_seconds']}s; first playable set "
+        f"({summary['first_playable_ready']}/{summary['first_playable_jobs']} assets) "
+        f"ready after {summary['first_playable_seconds']}s"
+    )
+
+
+def run_manifest(
+    manifest: AssetManifest,
+    concept: Optional[GameConcept] = None,
+    image_concurrency: Optional[int] = None,
+    audio_concurrency: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
+) -> ManifestRun:
+    """Blocking wrapper around ``arun_manifest`` that prints a short report."""
+    run = run_coroutine(arun_manifest(manifest, concept, image_concurrency, audio_concurrency, budget_seconds))
+    for result in run.results:
+        if not result.ok and not result.detail.get("skipped"):
+            print(f"  [{result.provider}] {result.name} failed: {result.detail.get('error')}")
+    skipped = [result.name for result in run.results if result.detail.get("skipped")]
+    if skipped:
+        print(f"  Skipped for the time budget: {', '.join(skipped)}")
+    print(f"  {format_manifest_summary(run.summary)}")
+    return run
+
+
+def write_manifests(manifest: AssetManifest, results: List[JobResult]) -> None:
+    """Record the produced files in ./assets/manifest_images.json and manifest_audio.json."""
+    produced = {(result.provider, result.name): result for result in results if result.ok}
+
+    images = {}
+    for job in unique_jobs(manifest.image_jobs):
+        result = produced.get(("openai", job.name))
+        if result is None:
+            continue
+        width, height = (int(side) for side in job.size.split("x"))
+        images[safe_name(job.name)] = {"file": result.file, "prompt": job.prompt, "width": width,
+                                       "height": height, "notes": job.purpose or "",
+                                       "category": job.category, "priority": result.priority, "sha256": result.detail.get("sha256")}
+
+    sounds = {}
+    for job in unique_jobs(manifest.audio_jobs):
+        result = produced.get(("freesound", job.name))
+        if result is None:
+            continue
+        sounds[safe_name(job.name)] = {"file": result.file, "query": job.query, "kind": job.kind,
+                                       "priority": result.priority,
+                                       "original_url": result.detail.get("original_url", ""),
+                                       "preview_url": result.detail.get("preview_url", ""),
+                                       "duration": result.detail.get("duration")}
+
+    atomic_write_text(Path("./assets/manifest_images.json"), json.dumps(images, indent=2))
+    atomic_write_text(Path("./assets/manifest_audio.json"), json.dumps(sounds, indent=2))
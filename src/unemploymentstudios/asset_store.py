@@ -0,0 +1,239 @@
+"""
+Content-addressed blob store for generated images and sounds.
+
+Every asset file is stored once under its SHA-256, and the per-game trees
+(``./assets``, ``./public/assets``, ``./Game/assets``) are materialised from
+the store as reflinks or hardlinks, falling back to a copy only when the
+filesystem supports neither (or the store is on another device). Identical
+assets across runs and across batch games therefore share one copy on disk,
+and organising a large asset set no longer copies any bytes. Because a
+hardlinked file shares its blob, anything that rewrites an asset must
+replace the file (as the asset tools do) rather than write into it.
+
+Layout::
+
+    .asset_store/objects/<sha[:2]>/<sha[2:]>
+
+``AssetIndex`` keeps a per-tree record of what has already been organised so
+re-runs only touch new or changed files.
+
+Settings (environment):
+    ASSET_STORE_DIR     store directory (default ./.asset_store)
+"""
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from unemploymentstudios.checkpoint import atomic_write_text
+
+try:  # reflinks are a Linux ioctl; other platforms go straight to hardlinks
+    import fcntl
+    FICLONE = 0x40049409
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks not supported on this platform")
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dest)
+            raise
+
+
+def _copy(src: Path, dest: Path) -> None:
+    shutil.copy2(src, dest)
+
+
+# Tried in order; the first that works for a given pair of paths wins
+LINK_STRATEGIES = (("reflink", _reflink), ("hardlink", os.link), ("copy", _copy))
+
+
+def link_or_copy(src: Union[str, Path], dest: Union[str, Path]) -> str:
+    """
+    Make ``dest`` a reflink, hardlink or (failing both) copy of ``src`` via a
+    temp name and an atomic rename, so ``dest`` is never seen half-written.
+    Returns the strategy that was used.
+    """
+    src, dest = Path(src), Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        for name, strategy in LINK_STRATEGIES:
+            tmp.unlink(missing_ok=True)
+            try:
+                strategy(src, tmp)
+            except OSError:
+                continue
+            os.replace(tmp, dest)
+            return name
+        raise OSError(f"could not link or copy {src} to {dest}")
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class AssetStore:
+    """Blob store plus the link-or-copy materialisation of its objects."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"stored": 0, "deduplicated": 0,
+                                       "reflink": 0, "hardlink": 0, "copy": 0, "unchanged": 0}
+
+    @classmethod
+    def from_env(cls) -> "AssetStore":
+        return cls(os.path.abspath(os.getenv("ASSET_STORE_DIR", "./.asset_store")))
+
+    def blob_path(self, sha: str) -> Path:
+        return self.root / "objects" / sha[:2] / sha[2:]
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    # ------------------------------------------------------------------
+    # Linking
+    # ------------------------------------------------------------------
+    def add(self, path: Union[str, Path], sha: str = "") -> str:
+        """
+        Store ``path`` under its SHA-256 (computed unless given) and return
+        the hash. If the content is already stored, ``path`` itself is
+        re-pointed at the existing blob so the duplicate is freed.
+        """
+        path = Path(path)
+        sha = sha or file_sha256(path)
+        blob = self.blob_path(sha)
+        if not blob.exists():
+            link_or_copy(path, blob)
+            self._count("stored")
+        elif not _same_file(path, blob):
+            link_or_copy(blob, path)
+            self._count("deduplicated")
+        return sha
+
+    def materialise(self, sha: str, dest: Union[str, Path]) -> str:
+        """Point ``dest`` at the blob for ``sha``; returns the strategy used."""
+        dest = Path(dest)
+        blob = self.blob_path(sha)
+        if not blob.exists():
+            raise FileNotFoundError(f"asset {sha} is not in the store at {self.root}")
+        if dest.exists() and _same_file(dest, blob):
+            self._count("unchanged")
+            return "unchanged"
+        strategy = link_or_copy(blob, dest)
+        self._count(strategy)
+        return strategy
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+class AssetIndex:
+    """
+    Persistent record of which source files have been organised into a
+    game's asset tree: ``{source: {size, mtime_ns, sha256, kind, dest}}``.
+
+    ``sync`` only hashes and links sources whose size or mtime changed,
+    prunes entries (and their linked copies) whose source is gone, and
+    saves the index atomically. The organised tree can then be read back
+    from the index without walking it.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Union[str, Path], store: AssetStore):
+        self.path = Path(path)
+        self.store = store
+        self.files: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass  # missing or corrupt: start from scratch
+
+    def sync(
+        self,
+        roots: Iterable[Union[str, Path]],
+        destination: Callable[[Path], Optional[Tuple[str, Path]]],
+    ) -> Dict[str, int]:
+        """
+        Bring the index up to date with every file under ``roots``.
+        ``destination(path)`` returns ``(kind, dest)`` for files to organise,
+        or None to ignore them.
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "pruned": 0}
+        seen = set()
+        for root in roots:
+            root = Path(root)
+            if not root.exists():
+                continue
+            for path in sorted(root.rglob("*")):
+                if path.name.startswith(".") or not path.is_file():
+                    continue  # temp files from interrupted writes
+                target = destination(path)
+                if target is None:
+                    continue
+                kind, dest = target
+                key = str(path)
+                seen.add(key)
+                stat = path.stat()
+                entry = self.files.get(key)
+                if (entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                        and entry["dest"] == str(dest) and Path(dest).exists()):
+                    counts["unchanged"] += 1
+                    continue
+                sha = self.store.add(path)
+                self.store.materialise(sha, dest)
+                stat = path.stat()  # add() may have re-pointed the source at its blob
+                counts["updated" if entry else "added"] += 1
+                self.files[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                   "sha256": sha, "kind": kind, "dest": str(dest)}
+
+        for key in [key for key in self.files if key not in seen]:
+            dest = self.files.pop(key)["dest"]
+            if not any(entry["dest"] == dest for entry in self.files.values()):
+                Path(dest).unlink(missing_ok=True)
+            counts["pruned"] += 1
+
+        atomic_write_text(self.path, json.dumps({"version": self.VERSION, "files": self.files}, indent=2))
+        return counts
+
+    def outputs(self, kind: str) -> Dict[str, str]:
+        """``{file name: organised path}`` for every indexed file of ``kind``."""
+        return {Path(entry["dest"]).name: entry["dest"]
+                for entry in self.files.values() if entry["kind"] == kind}
+
+
+asset_store = AssetStore.from_env()
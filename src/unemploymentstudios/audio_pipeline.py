@@ -0,0 +1,297 @@
+"""
+Post-processing for the organised sounds in Game/assets/audio.
+
+Freesound HQ previews arrive as they were uploaded: leading and trailing
+silence, loudness all over the place and more bytes than a browser game
+needs. ``process_audio`` runs after the assets are organised and writes,
+under Game/assets/optimized/audio/:
+
+    <name>.ogg|.mp3            trimmed, loudness-normalised, re-encoded
+    sfx-sprite.ogg|.mp3        short effects (jump, collect, ...) back to back
+    sfx-sprite.json            offsets in the howler.js sprite format:
+                               {"src": [...], "sprite": {name: [offset_ms, duration_ms]}}
+
+Each sound is decoded once into a common 44.1 kHz stereo WAV (silence
+trimmed, ``loudnorm`` applied) and encoded from there; the sprite is joined
+from those WAVs, so its offsets are exact. ffmpeg does the work, one process
+per job, with up to AUDIO_PIPELINE_WORKERS jobs at a time across the CPU
+cores. Every output is kept in ``processed_cache`` under a hash of its input
+and settings, so unchanged sounds are linked into place on the next run.
+
+ffmpeg is optional; without it this stage is skipped.
+
+Settings (environment):
+    FFMPEG                    ffmpeg binary (default "ffmpeg" on PATH)
+    AUDIO_SFX_LUFS            loudness target for effects (default -16)
+    AUDIO_MUSIC_LUFS          loudness target for music and ambience (default -20)
+    AUDIO_SILENCE_DB          level treated as silence when trimming (default -50)
+    AUDIO_OGG_QUALITY         Vorbis quality, 0-10 (default 4)
+    AUDIO_MP3_QUALITY         LAME VBR quality, 0 (best) to 9 (default 5)
+    AUDIO_SPRITE_MAX_SECONDS  longest effect packed into the sprite (default 3)
+    AUDIO_SPRITE_GAP_MS       silence between sprite entries (default 250)
+    AUDIO_PIPELINE_WORKERS    concurrent ffmpeg processes (default: CPU count)
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from unemploymentstudios.asset_store import file_sha256
+from unemploymentstudios.checkpoint import atomic_write_text
+from unemploymentstudios.tools.asset_cache import processed_cache
+
+# Bump when the processing below changes, so cached outputs are not reused
+PIPELINE_VERSION = 1
+
+AUDIO_SUFFIXES = {".mp3", ".wav", ".ogg", ".flac", ".m4a"}
+FFMPEG = os.getenv("FFMPEG", "ffmpeg")
+SFX_LUFS = float(os.getenv("AUDIO_SFX_LUFS", "-16"))
+MUSIC_LUFS = float(os.getenv("AUDIO_MUSIC_LUFS", "-20"))
+SILENCE_DB = float(os.getenv("AUDIO_SILENCE_DB", "-50"))
+OGG_QUALITY = int(os.getenv("AUDIO_OGG_QUALITY", "4"))
+MP3_QUALITY = int(os.getenv("AUDIO_MP3_QUALITY", "5"))
+SPRITE_MAX_SECONDS = float(os.getenv("AUDIO_SPRITE_MAX_SECONDS", "3"))
+SPRITE_GAP_MS = int(os.getenv("AUDIO_SPRITE_GAP_MS", "250"))
+AUDIO_PIPELINE_WORKERS = int(os.getenv("AUDIO_PIPELINE_WORKERS", "0")) or os.cpu_count() or 1
+FFMPEG_TIMEOUT_SECONDS = 300
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+SPRITE_NAME = "sfx-sprite"
+ENCODINGS = {
+    "ogg": ["-c:a", "libvorbis", "-q:a", str(OGG_QUALITY), "-f", "ogg"],
+    "mp3": ["-c:a", "libmp3lame", "-q:a", str(MP3_QUALITY), "-f", "mp3"],
+}
+
+
+class AudioRun(NamedTuple):
+    outputs: Dict[str, str]  # {output file name: path}
+    summary: Dict[str, Any]
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG) is not None
+
+
+def _ffmpeg(args: List[str], dest: Union[str, Path]) -> None:
+    """Run ffmpeg writing to a temp file next to ``dest``, then rename it into place."""
+    dest = Path(dest)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        subprocess.run([FFMPEG, "-hide_banner", "-loglevel", "error", "-y", *args, tmp],
+                       check=True, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS)
+        os.chmod(tmp, 0o644)  # served by a web server, unlike mkstemp's private default
+        os.replace(tmp, dest)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.decode("utf-8", "replace").strip() or str(e)) from None
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def _wav_frames(path: Union[str, Path]) -> int:
+    with wave.open(str(path), "rb") as w:
+        return w.getnframes()
+
+
+def _filters(lufs: float) -> str:
+    """Trim silence at both ends (by trimming the start of the reversed clip), then normalise loudness."""
+    trim = f"silenceremove=start_periods=1:start_threshold={SILENCE_DB}dB:start_silence=0.02"
+    return f"{trim},areverse,{trim},areverse,loudnorm=I={lufs}:TP=-1.5:LRA=11"
+
+
+# ---------------------------------------------------------------------------
+#  Jobs (each one runs ffmpeg processes on a worker thread)
+# ---------------------------------------------------------------------------
+def _process_sound(src: str, lufs: float, wav_dest: str, dests: Dict[str, str]) -> int:
+    """Normalise ``src`` into ``wav_dest``, encode every format; returns the WAV's frame count."""
+    _ffmpeg(["-i", src, "-af", _filters(lufs), "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS),
+             "-c:a", "pcm_s16le", "-f", "wav"], wav_dest)
+    for fmt, dest in dests.items():
+        _ffmpeg(["-i", wav_dest, *ENCODINGS[fmt]], dest)
+    return _wav_frames(wav_dest)
+
+
+def _build_sprite(wavs: List[str], wav_dest: str, dests: Dict[str, str]) -> None:
+    """Join same-format WAVs with SPRITE_GAP_MS of silence between them, then encode."""
+    gap = b"\x00" * (SAMPLE_RATE * SPRITE_GAP_MS // 1000) * CHANNELS * 2
+    with wave.open(wav_dest, "wb") as out:
+        out.setnchannels(CHANNELS)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        for i, path in enumerate(wavs):
+            if i:
+                out.writeframes(gap)
+            with wave.open(path, "rb") as clip:
+                out.writeframes(clip.readframes(clip.getnframes()))
+    for fmt, dest in dests.items():
+        _ffmpeg(["-i", wav_dest, *ENCODINGS[fmt]], dest)
+
+
+def _sprite_member(kind: Optional[str], frames: int) -> bool:
+    return kind not in ("music", "ambient") and frames <= SPRITE_MAX_SECONDS * SAMPLE_RATE
+
+
+def sprite_map(frames: Dict[str, int], sources: List[str]) -> Dict[str, Any]:
+    """howler.js sprite definition for clips of ``frames`` joined in order."""
+    sprite, offset = {}, 0
+    gap_frames = SAMPLE_RATE * SPRITE_GAP_MS // 1000
+    for name, count in frames.items():
+        sprite[name] = [round(offset * 1000 / SAMPLE_RATE), round(count * 1000 / SAMPLE_RATE)]
+        offset += count + gap_frames
+    return {"src": sources, "sprite": sprite}
+
+
+# ---------------------------------------------------------------------------
+#  Cache
+# ---------------------------------------------------------------------------
+def _cache_keys(formats: List[str], **params: Any) -> Dict[str, str]:
+    settings = {"ogg": OGG_QUALITY, "mp3": MP3_QUALITY, "wav": None}
+    return {fmt: processed_cache.make_key(format=fmt, quality=settings[fmt], version=PIPELINE_VERSION, **params)
+            for fmt in formats}
+
+
+def _from_cache(keys: Dict[str, str], dests: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+    """Link every cached output into place and return the first one's record, or None."""
+    if not processed_cache.enabled:
+        return None
+    records = [processed_cache.fetch(keys[fmt], dests[fmt]) for fmt in keys]
+    return records[0] if all(records) else None
+
+
+def _to_cache(keys: Dict[str, str], dests: Dict[str, Path], record: Dict[str, Any]) -> None:
+    if not processed_cache.enabled:
+        return
+    try:
+        for fmt in keys:
+            processed_cache.store(keys[fmt], dests[fmt], record)
+    except OSError as e:
+        print(f"  Warning: could not cache {Path(dests['ogg']).stem}: {e}")
+
+
+# ---------------------------------------------------------------------------
+#  Stage
+# ---------------------------------------------------------------------------
+def _manifest_kinds(manifest_path: Path) -> Dict[str, str]:
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {Path(entry.get("file", name)).stem: entry.get("kind", "")
+            for name, entry in manifest.items() if isinstance(entry, dict)}
+
+
+def process_audio(
+    audio_dir: Union[str, Path] = "./Game/assets/audio",
+    output_dir: Union[str, Path] = "./Game/assets/optimized/audio",
+    workers: Optional[int] = None,
+) -> AudioRun:
+    """Trim, normalise and re-encode every sound in ``audio_dir`` and build the SFX sprite."""
+    if not ffmpeg_available():
+        print(f"  {FFMPEG} not found; skipping audio post-processing.")
+        return AudioRun({}, {"skipped": True})
+
+    audio_dir, output_dir = Path(audio_dir), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    kinds = _manifest_kinds(audio_dir.parent / "manifest_audio.json")
+    sources = sorted(path for path in audio_dir.iterdir() if path.is_file()
+                     and not path.name.startswith(".") and path.suffix.lower() in AUDIO_SUFFIXES) \
+        if audio_dir.exists() else []
+    # Two clips with the same stem (jump.mp3, jump.wav) would share outputs; keep the first
+    unique: Dict[str, Path] = {}
+    for path in sources:
+        unique.setdefault(path.stem, path)
+    sources = list(unique.values())
+
+    # bytes_out is the OGG total, comparable with the sources' bytes_in
+    summary = {"sounds": len(sources), "processed": 0, "cached": 0, "failed": 0, "sprite_entries": 0,
+               "bytes_in": 0, "bytes_out": 0}
+    outputs: Dict[str, str] = {}
+    frames: Dict[str, int] = {}  # stem -> normalised length
+    shas: Dict[str, str] = {}
+
+    with tempfile.TemporaryDirectory(prefix="audio-pipeline-") as work, \
+            ThreadPoolExecutor(max_workers=max(1, workers or AUDIO_PIPELINE_WORKERS)) as pool:
+        work = Path(work)
+
+        # 1. Normalise and encode every sound (cache hits are linked in place)
+        futures = {}
+        for src in sources:
+            music = kinds.get(src.stem) in ("music", "ambient")
+            lufs = MUSIC_LUFS if music else SFX_LUFS
+            sha = shas[src.stem] = file_sha256(src)
+            summary["bytes_in"] += src.stat().st_size
+            keys = _cache_keys(["ogg", "mp3", "wav"], stage="normalise", sha256=sha, lufs=lufs,
+                               silence_db=SILENCE_DB)
+            dests = {"ogg": output_dir / f"{src.stem}.ogg", "mp3": output_dir / f"{src.stem}.mp3",
+                     "wav": work / f"{src.stem}.wav"}
+            # The normalised WAV is only kept for effects short enough for the sprite
+            record = _from_cache({fmt: keys[fmt] for fmt in ENCODINGS}, dests)
+            if record is not None and _sprite_member(kinds.get(src.stem), record["frames"]):
+                if _from_cache({"wav": keys["wav"]}, dests) is None:
+                    record = None
+            if record is not None:
+                summary["cached"] += 1
+                frames[src.stem] = record["frames"]
+                continue
+            futures[src.stem] = (sha, keys, dests, pool.submit(
+                _process_sound, str(src), lufs, str(dests["wav"]),
+                {fmt: str(dests[fmt]) for fmt in ENCODINGS}))
+
+        for stem, (sha, keys, dests, future) in futures.items():
+            try:
+                frames[stem] = future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                print(f"  Warning: could not process sound {stem}: {e}")
+                continue
+            summary["processed"] += 1
+            if not _sprite_member(kinds.get(stem), frames[stem]):
+                keys = {fmt: keys[fmt] for fmt in ENCODINGS}
+            _to_cache(keys, dests, {"source_sha256": sha, "frames": frames[stem], "rate": SAMPLE_RATE})
+
+        for stem in frames:
+            for fmt in ENCODINGS:
+                path = output_dir / f"{stem}.{fmt}"
+                outputs[path.name] = str(path)
+                summary["bytes_out"] += path.stat().st_size if fmt == "ogg" else 0
+
+        # 2. Join the short effects into one sprite
+        members = {stem: count for stem, count in frames.items() if _sprite_member(kinds.get(stem), count)}
+        if len(members) >= 2:
+            dests = {fmt: output_dir / f"{SPRITE_NAME}.{fmt}" for fmt in ENCODINGS}
+            keys = _cache_keys(list(ENCODINGS), stage="sprite", gap_ms=SPRITE_GAP_MS, lufs=SFX_LUFS,
+                               silence_db=SILENCE_DB,
+                               members=[[stem, shas[stem], count] for stem, count in members.items()])
+            built = _from_cache(keys, dests) is not None
+            if built:
+                summary["cached"] += 1
+            else:
+                try:
+                    pool.submit(_build_sprite, [str(work / f"{stem}.wav") for stem in members],
+                                str(work / f"{SPRITE_NAME}.wav"), {fmt: str(dests[fmt]) for fmt in ENCODINGS}).result()
+                    _to_cache(keys, dests, {"sprite": SPRITE_NAME, "entries": len(members)})
+                    built = True
+                except Exception as e:
+                    summary["failed"] += 1
+                    print(f"  Warning: could not build the SFX sprite: {e}")
+            if built:
+                sprite_json = output_dir / f"{SPRITE_NAME}.json"
+                atomic_write_text(sprite_json, json.dumps(
+                    sprite_map(members, [dests[fmt].name for fmt in ENCODINGS]), indent=2))
+                os.chmod(sprite_json, 0o644)
+                for path in (*dests.values(), sprite_json):
+                    outputs[path.name] = str(path)
+                summary["sprite_entries"] = len(members)
+
+    # 3. Drop outputs of sounds that no longer exist
+    for path in output_dir.iterdir():
+        if path.is_file() and not path.name.startswith(".") and path.name not in outputs:
+            path.unlink()
+    return AudioRun(outputs, summary)
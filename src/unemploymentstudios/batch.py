@@ -0,0 +1,152 @@
+"""
+Batch generation: one GameFlow per concept, spread over a process pool.
+
+The flow and the asset tools write to paths relative to the working
+directory (``./Game``, ``./assets``, ``./public/assets``, ``./runs``), so each
+game is generated by a worker that first changes into its own output root.
+Output from each game goes to ``<output root>/run.log`` instead of being
+interleaved on the console.
+"""
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def load_concepts(path: str) -> List[Dict[str, str]]:
+    """
+    Read one concept object per JSONL line. Keys may be either the
+    ``concept.json`` names ("Game mechanics", ...) or GameState field names.
+    """
+    from unemploymentstudios.main import CONCEPT_FIELDS, CONCEPT_KEYS
+
+    concepts = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            if not isinstance(raw, dict):
+                raise ValueError(f"{path}:{line_no}: expected a JSON object per line")
+            inputs = {}
+            for key, value in raw.items():
+                field = CONCEPT_KEYS.get(key, key)
+                if field in CONCEPT_FIELDS:
+                    inputs[field] = str(value)
+            if not inputs:
+                raise ValueError(f"{path}:{line_no}: no recognised concept fields")
+            concepts.append(inputs)
+    return concepts
+
+
+def _slug(text: str, max_words: int = 5) -> str:
+    words = re.findall(r"[a-z0-9]+", text.lower())[:max_words]
+    return "-".join(words) or "game"
+
+
+def _run_one(index: int, inputs: Dict[str, str], output_root: str) -> Dict[str, Any]:
+    """Worker entry point: generate one game inside ``output_root``."""
+    from unemploymentstudios.main import run_game
+
+    root = Path(output_root)
+    root.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"index": index, "output_root": str(root), "status": "ok"}
+
+    previous_cwd = os.getcwd()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = os.dup(1), os.dup(2)
+    with open(root / "run.log", "w", encoding="utf-8") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            os.chdir(root)
+            flow = run_game(inputs)
+            result["code_files"] = len(flow.state.generatedCodeFiles)
+            result["images"] = len(flow.state.generatedImages)
+            result["sounds"] = len(flow.state.generatedSounds)
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for fd in saved_fds:
+                os.close(fd)
+            os.chdir(previous_cwd)
+
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def run_batch(concepts_path: str, workers: int = 2, output_dir: str = "./batch_runs") -> Dict[str, Any]:
+    """
+    Generate every concept in ``concepts_path`` with ``workers`` games in
+    parallel, write ``batch_report.json`` to ``output_dir`` and return it.
+    """
+    concepts = load_concepts(concepts_path)
+    output = Path(output_dir).resolve()
+    output.mkdir(parents=True, exist_ok=True)
+
+    # Share one LLM cache across all workers rather than one per output root...
+    os.environ["LLM_CACHE_DIR"] = os.path.abspath(os.getenv("LLM_CACHE_DIR", "./.llm_cache"))
+    # ...and one asset store, so identical assets across games are stored once
+    os.environ["ASSET_STORE_DIR"] = os.path.abspath(os.getenv("ASSET_STORE_DIR", "./.asset_store"))
+    os.environ["IMAGE_CACHE_DIR"] = os.path.abspath(os.getenv("IMAGE_CACHE_DIR", "./.image_cache"))
+    os.environ["FREESOUND_CACHE_DIR"] = os.path.abspath(os.getenv("FREESOUND_CACHE_DIR", "./.freesound_cache"))
+    os.environ["PROCESSED_CACHE_DIR"] = os.path.abspath(os.getenv("PROCESSED_CACHE_DIR", "./.processed_cache"))
+
+    print(f"=== Batch: {len(concepts)} concepts, {workers} workers, output in {output} ===")
+    started = time.perf_counter()
+    games: List[Dict[str, Any]] = []
+
+    # spawn: the flow starts threads and event loops, which do not survive fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context) as pool:
+        futures = {
+            pool.submit(
+                _run_one,
+                index,
+                inputs,
+                str(output / f"{index:03d}-{_slug(inputs.get('Storyline', ''))}"),
+            ): index
+            for index, inputs in enumerate(concepts)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                game = future.result()
+            except Exception as e:  # worker died (e.g. killed / out of memory)
+                game = {"index": index, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            games.append(game)
+            status = "OK    " if game["status"] == "ok" else "FAILED"
+            detail = game.get("error") or f"{game.get('code_files', 0)} files"
+            print(f"  [{status}] #{index:03d} {game.get('seconds', 0):>8.1f}s  {detail}")
+
+    wall = time.perf_counter() - started
+    failed = [game for game in games if game["status"] != "ok"]
+    report = {
+        "concepts": len(concepts),
+        "workers": workers,
+        "succeeded": len(games) - len(failed),
+        "failed": len(failed),
+        "wall_seconds": round(wall, 2),
+        "games_per_hour": round(len(games) / wall * 3600, 2) if wall else 0.0,
+        "games": sorted(games, key=lambda game: game["index"]),
+    }
+    with open(output / "batch_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"=== Batch complete: {report['succeeded']} succeeded, {report['failed']} failed "
+          f"in {wall:.1f}s ({report['games_per_hour']} games/hour) ===")
+    return report
@@ -0,0 +1,566 @@
+"""
+Production build of the generated game.
+
+``write_code_files`` leaves one unminified file per planned module in ./Game,
+so the browser makes a request for each. ``build_game`` writes an optimised
+copy of the tree to ./Game/dist:
+
+    <page>.html               local script and stylesheet references rewritten
+    bundle.<hash>.js          adjacent classic <script src> tags of a page,
+                              concatenated in document order and minified
+    bundle.<hash>.css         adjacent local stylesheets, likewise
+    <path>.<hash>.js|.css     a lone script or stylesheet, or an ES module,
+                              minified; module imports point at hashed names
+    <path>.js|.css            every script and stylesheet, minified under its
+                              own name for code that loads it dynamically
+    everything else           linked unchanged (asset paths are built at
+                              runtime by game code, so assets keep their names)
+    *.gz, *.br                precompressed variants of the text files
+    build-manifest.json       {source path: hashed path}
+
+ES modules are hashed in dependency order - the FileStructureSpec graph merged
+with the imports actually found in the code - so a module's name changes
+whenever anything it imports changes. The minifiers only strip comments and
+collapse whitespace, keeping line breaks wherever one could end a statement;
+that is safe on generated code without a full parser or a Node toolchain.
+
+The build is written to a temp directory that replaces ./Game/dist once
+complete. ``.br`` files need the optional ``brotli`` module.
+
+Settings (environment):
+    BUILD_HASH_LENGTH           hex digits of content hash in file names (default 10)
+    BUILD_COMPRESS_MIN_BYTES    smallest file that gets .gz/.br variants (default 256)
+    BUILD_GZIP_LEVEL            gzip level, 1-9 (default 9)
+    BUILD_BROTLI_QUALITY        brotli quality, 0-11 (default 11)
+    BUILD_WORKERS               compression threads (default: CPU count)
+"""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from unemploymentstudios.asset_store import link_or_copy
+from unemploymentstudios.js_lexer import (
+    REGEX_KEYWORDS,
+    REGEX_PRECEDERS,
+    WHITESPACE,
+    is_word,
+    scan_regex,
+    scan_string,
+    scan_template,
+)
+from unemploymentstudios.scheduling import (
+    DependencyCycleError,
+    build_dependency_graph,
+    normalise_filename,
+    topological_order,
+)
+from unemploymentstudios.types import FileStructureSpec
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only .gz variants are written
+    brotli = None
+
+HASH_LENGTH = int(os.getenv("BUILD_HASH_LENGTH", "10"))
+COMPRESS_MIN_BYTES = int(os.getenv("BUILD_COMPRESS_MIN_BYTES", "256"))
+GZIP_LEVEL = int(os.getenv("BUILD_GZIP_LEVEL", "9"))
+BROTLI_QUALITY = int(os.getenv("BUILD_BROTLI_QUALITY", "11"))
+BUILD_WORKERS = int(os.getenv("BUILD_WORKERS", "0")) or os.cpu_count() or 1
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "build-manifest.json"
+JS_SUFFIXES = {".js", ".mjs"}
+CSS_SUFFIXES = {".css"}
+COMPRESSIBLE_SUFFIXES = {".html", ".htm", ".js", ".mjs", ".css", ".json", ".svg", ".xml", ".txt", ".wasm"}
+# Pipeline by-products in ./Game that are not part of the game itself
+EXCLUDED_SUFFIXES = {".md", ".txt", ".prom", ".log"}
+EXCLUDED_NAMES = {"metrics.json", "performance_report.json", "validation_report.json"}
+
+
+class BuildRun(NamedTuple):
+    outputs: Dict[str, str]  # {source path: hashed path}, relative to the game directory
+    summary: Dict[str, Any]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(path: str, data: bytes) -> str:
+    """``js/game.js`` -> ``js/game.<hash>.js``."""
+    stem, suffix = posixpath.splitext(path)
+    return f"{stem}.{content_hash(data)}{suffix}"
+
+
+# ---------------------------------------------------------------------------
+#  Minifiers
+# ---------------------------------------------------------------------------
+# A line break after/before these can never end a statement, so it can go
+NEWLINE_DROP_AFTER = set("{;,([=:")
+NEWLINE_DROP_BEFORE = set("}),;]")
+
+
+def minify_js(source: str) -> str:
+    """
+    Strip comments and collapse whitespace, leaving strings, template
+    literals and regex literals untouched. A line break is kept wherever it
+    could terminate a statement, so automatic semicolon insertion behaves as
+    it did in the original.
+    """
+    out: List[str] = []
+    pending = ""  # whitespace seen since the last token: "", " " or "\n"
+    last_word = ""  # identifier/keyword just emitted, to tell regexes from divisions
+    templates: List[int] = []  # brace depth inside each open ${...} substitution
+    i, n = 0, len(source)
+
+    def emit(text: str, word: str = "") -> None:
+        nonlocal pending, last_word
+        prev = out[-1][-1] if out else ""
+        if pending and prev:
+            if pending == "\n" and prev not in NEWLINE_DROP_AFTER and text[0] not in NEWLINE_DROP_BEFORE:
+                out.append("\n")
+            elif (is_word(prev) and (is_word(text[0]) or text[0] == ".")) \
+                    or (prev in "+-/" and text[0] == prev) or (prev == "/" and text[0] == "*"):
+                out.append(" ")
+        out.append(text)
+        pending, last_word = "", word
+
+    while i < n:
+        char = source[i]
+        if char in WHITESPACE:
+            if char == "\n":
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            if source.startswith("/*!", i):  # licence comment
+                emit(source[i:end])
+            elif "\n" in source[i:end]:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = end
+        elif char in "'\"":
+            end = scan_string(source, i)
+            emit(source[i:end])
+            i = end
+        elif char == "`":
+            end, substitution = scan_template(source, i + 1)
+            emit(source[i:end])
+            if substitution:
+                templates.append(0)
+            i = end
+        elif char == "}" and templates and templates[-1] == 0:
+            templates.pop()
+            end, substitution = scan_template(source, i + 1)
+            emit(source[i:end])
+            if substitution:
+                templates.append(0)
+            i = end
+        elif char == "/":
+            prev = out[-1][-1] if out else ""
+            end = None
+            if not prev or prev in REGEX_PRECEDERS or last_word in REGEX_KEYWORDS:
+                end = scan_regex(source, i)
+            emit(source[i:end] if end else char)
+            i = end or i + 1
+        elif is_word(char):
+            end = i + 1
+            while end < n and is_word(source[end]):
+                end += 1
+            emit(source[i:end], source[i:end])
+            i = end
+        else:
+            if templates:
+                if char == "{":
+                    templates[-1] += 1
+                elif char == "}":
+                    templates[-1] -= 1
+            emit(char)
+            i += 1
+    return "".join(out).strip() + "\n"
+
+
+def minify_css(source: str) -> str:
+    """Strip comments and collapse whitespace, leaving strings untouched."""
+    out: List[str] = []
+    pending = False
+    i, n = 0, len(source)
+    while i < n:
+        char = source[i]
+        if char.isspace():
+            pending = True
+            i += 1
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            pending = True
+        elif char in "'\"":
+            end = scan_string(source, i)
+            if pending and out and out[-1][-1] not in "{};,>(:":
+                out.append(" ")
+            out.append(source[i:end])
+            pending = False
+            i = end
+        else:
+            if char == "}" and out and out[-1] == ";":
+                out.pop()
+            if pending and out and out[-1][-1] not in "{};,>(:" and char not in "{};,>)!":
+                out.append(" ")
+            out.append(char)
+            pending = False
+            i += 1
+    return "".join(out).strip() + "\n"
+
+
+# ---------------------------------------------------------------------------
+#  References
+# ---------------------------------------------------------------------------
+IMPORT_PATTERN = re.compile(
+    r"""(\bimport\s*(?:[\w$*{}\s,]+?\s*from\s*)?|\bexport\s*[\w$*{}\s,]+?\s*from\s*|\bimport\s*\(\s*)(['"])([^'"\n]+)\2"""
+)
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+EXTERNAL_PATTERN = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|//|#)", re.IGNORECASE)
+
+
+def resolve(base_dir: str, reference: str) -> Optional[str]:
+    """Resolve a local URL against ``base_dir`` to a path relative to the game root."""
+    reference = reference.strip().split("#")[0].split("?")[0]
+    if not reference or EXTERNAL_PATTERN.match(reference):
+        return None
+    path = reference.lstrip("/") if reference.startswith("/") else posixpath.join(base_dir, reference)
+    path = posixpath.normpath(path)
+    return None if path.startswith("..") else path
+
+
+def module_imports(path: str, code: str, files: Dict[str, Path]) -> List[str]:
+    """Local modules imported by ``code``, as paths relative to the game root."""
+    found = []
+    for match in IMPORT_PATTERN.finditer(code):
+        target = resolve(posixpath.dirname(path), match.group(3))
+        if target in files and target not in found and target != path:
+            found.append(target)
+    return found
+
+
+def rewrite_imports(path: str, code: str, renamed: Dict[str, str]) -> str:
+    base = posixpath.dirname(path)
+
+    def replace(match: "re.Match[str]") -> str:
+        target = resolve(base, match.group(3))
+        if target not in renamed:
+            return match.group(0)
+        url = posixpath.relpath(renamed[target], base or ".")
+        if not url.startswith("."):
+            url = f"./{url}"
+        return f"{match.group(1)}{match.group(2)}{url}{match.group(2)}"
+
+    return IMPORT_PATTERN.sub(replace, code)
+
+
+def rebase_css_urls(css: str, from_dir: str, to_dir: str) -> str:
+    """Rewrite relative url()s of a stylesheet moved from ``from_dir`` to ``to_dir``."""
+    if from_dir == to_dir:
+        return css
+
+    def replace(match: "re.Match[str]") -> str:
+        reference = match.group(2).strip()
+        if reference.startswith("/") or EXTERNAL_PATTERN.match(reference):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(from_dir, reference))
+        return f"url({match.group(1)}{posixpath.relpath(target, to_dir or '.')}{match.group(1)})"
+
+    return CSS_URL_PATTERN.sub(replace, css)
+
+
+def is_strict(js: str) -> bool:
+    return js.startswith(('"use strict"', "'use strict'"))
+
+
+class _TagFinder(HTMLParser):
+    """Collect <script> and <link rel="stylesheet"> elements with their source offsets."""
+
+    def __init__(self, html: str):
+        super().__init__(convert_charrefs=True)
+        # getpos() counts lines by "\n" only
+        self.line_offsets = [0] + [match.end() for match in re.finditer("\n", html)]
+        self.tags: List[Dict[str, Any]] = []
+        self._open_script: Optional[Dict[str, Any]] = None
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        start = self._offset()
+        end = start + len(self.get_starttag_text() or "")
+        attributes = {name.lower(): value for name, value in attrs}
+        if tag == "script":
+            self._open_script = {"tag": tag, "attrs": attributes, "start": start, "end": end}
+        elif tag == "link" and "stylesheet" in (attributes.get("rel") or "").lower().split():
+            self.tags.append({"tag": tag, "attrs": attributes, "start": start, "end": end})
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script" and self._open_script is not None:
+            start = self._offset()
+            self._open_script["end"] = start + len("</script>")
+            self.tags.append(self._open_script)
+            self._open_script = None
+
+
+# ---------------------------------------------------------------------------
+#  Build
+# ---------------------------------------------------------------------------
+def _source_files(game_dir: Path) -> Dict[str, Path]:
+    files: Dict[str, Path] = {}
+    for root, dirs, names in os.walk(game_dir):
+        relative_root = Path(root).relative_to(game_dir).as_posix()
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".")
+                         and not (relative_root == "." and d == DIST_DIR))
+        for name in sorted(names):
+            if name.startswith(".") or name in EXCLUDED_NAMES or Path(name).suffix.lower() in EXCLUDED_SUFFIXES:
+                continue
+            path = posixpath.normpath(posixpath.join(relative_root, name))
+            files[path] = Path(root) / name
+    return files
+
+
+def _script_kind(attrs: Dict[str, Optional[str]]) -> Optional[str]:
+    """"module", "classic" or None for scripts the build leaves alone."""
+    script_type = (attrs.get("type") or "").strip().lower()
+    if script_type == "module":
+        return "module"
+    if script_type in ("", "text/javascript", "application/javascript") \
+            and "async" not in attrs and "integrity" not in attrs:
+        return "classic"
+    return None
+
+
+class _Builder:
+    def __init__(self, game_dir: Path, dist: Path, spec: Optional[FileStructureSpec]):
+        self.game_dir, self.dist = game_dir, dist
+        self.files = _source_files(game_dir)
+        self.spec = spec
+        self.minified: Dict[str, str] = {}
+        self.renamed: Dict[str, str] = {}  # source path -> hashed path
+        self.written: Dict[str, bytes] = {}
+        self.summary = {"html": 0, "scripts": 0, "stylesheets": 0, "bundles": 0,
+                        "code_bytes_in": 0, "code_bytes_out": 0}
+
+    def read(self, path: str) -> str:
+        return self.files[path].read_text(encoding="utf-8", errors="replace")
+
+    def write(self, path: str, data: bytes) -> None:
+        dest = self.dist / path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+        self.written[path] = data
+
+    def minify(self, path: str) -> str:
+        if path not in self.minified:
+            source = self.read(path)
+            is_js = Path(path).suffix.lower() in JS_SUFFIXES
+            self.minified[path] = minify_js(source) if is_js else minify_css(source)
+            self.summary["scripts" if is_js else "stylesheets"] += 1
+            self.summary["code_bytes_in"] += len(source.encode("utf-8"))
+        return self.minified[path]
+
+    def emit_hashed(self, path: str, text: str) -> str:
+        data = text.encode("utf-8")
+        name = hashed_name(path, data)
+        self.write(name, data)
+        self.summary["code_bytes_out"] += len(data)
+        return name
+
+    # -- ES modules ---------------------------------------------------------
+    def module_graph(self) -> Dict[str, List[str]]:
+        """Imports found in every JS file, plus the planned dependencies between them."""
+        scripts = [path for path in self.files if Path(path).suffix.lower() in JS_SUFFIXES]
+        graph = {path: module_imports(path, self.minify(path), self.files) for path in scripts}
+        if self.spec is not None:
+            planned = {normalise_filename(name): deps for name, deps in build_dependency_graph(self.spec).items()}
+            for path, deps in planned.items():
+                if path in graph:
+                    graph[path] += [normalise_filename(dep) for dep in deps
+                                    if normalise_filename(dep) in graph and normalise_filename(dep) not in graph[path]]
+        return graph
+
+    def hash_modules(self, entries: List[str]) -> None:
+        """Hash every module reachable from ``entries``, dependencies first."""
+        graph = self.module_graph()
+        reachable, stack = set(), list(entries)
+        while stack:
+            path = stack.pop()
+            if path not in reachable and path in graph:
+                reachable.add(path)
+                stack.extend(graph[path])
+        subgraph = {path: [dep for dep in graph[path] if dep in reachable] for path in reachable}
+        try:
+            order = topological_order(subgraph)
+        except DependencyCycleError as e:
+            print(f"  Warning: {e}; ES modules keep their original names")
+            return
+        for path in order:
+            code = rewrite_imports(path, self.minify(path), self.renamed)
+            self.renamed[path] = self.emit_hashed(path, code)
+
+    # -- Pages --------------------------------------------------------------
+    def bundle(self, page_dir: str, kind: str, members: List[str]) -> str:
+        """Write one hashed file for ``members`` and return its path."""
+        if kind == "css":
+            text = "".join(rebase_css_urls(self.minify(path), posixpath.dirname(path), page_dir)
+                           for path in members) if len(members) > 1 else self.minify(members[0])
+            text = re.sub(r'@charset\s*"[^"]*";', "", text) if len(members) > 1 else text
+        else:
+            text = ";\n".join(self.minify(path).rstrip("\n") for path in members) + "\n"
+        if len(members) == 1:
+            name = self.emit_hashed(members[0], text)
+            self.renamed.setdefault(members[0], name)
+            return name
+        self.summary["bundles"] += 1
+        name = self.emit_hashed(posixpath.join(page_dir, f"bundle.{kind}"), text)
+        for path in members:
+            self.renamed.setdefault(path, name)
+        return name
+
+    def build_page(self, page: str) -> None:
+        html = self.read(page)
+        page_dir = posixpath.dirname(page)
+        finder = _TagFinder(html)
+        finder.feed(html)
+        finder.close()
+
+        # Group adjacent local scripts/stylesheets that can share one file
+        groups: List[Dict[str, Any]] = []
+        for tag in sorted(finder.tags, key=lambda t: t["start"]):
+            attrs = tag["attrs"]
+            if tag["tag"] == "script":
+                kind, path = "js", resolve(page_dir, attrs.get("src") or "")
+                mode = _script_kind(attrs) if attrs.get("src") else None
+                key = (mode, "defer" in attrs, "nomodule" in attrs)
+            else:
+                kind, path, mode = "css", resolve(page_dir, attrs.get("href") or ""), "stylesheet"
+                key = (mode, attrs.get("media") or "")
+            if path not in self.files or mode is None or "integrity" in attrs:
+                groups.append({"tags": [tag], "paths": [], "key": None})
+                continue
+            strict = kind == "js" and is_strict(self.minify(path))
+            previous = groups[-1] if groups else None
+            if previous and previous["key"] == (key, strict) and mode != "module" \
+                    and not (kind == "css" and "@import" in self.minify(path)) \
+                    and not html[previous["tags"][-1]["end"]:tag["start"]].strip():
+                previous["tags"].append(tag)
+                previous["paths"].append(path)
+            else:
+                bundleable = mode != "module" and not (kind == "css" and "@import" in self.minify(path))
+                groups.append({"tags": [tag], "paths": [path], "key": (key, strict) if bundleable else None,
+                               "kind": kind, "mode": mode})
+
+        modules = [group["paths"][0] for group in groups if group.get("mode") == "module"]
+        if modules:
+            self.hash_modules(modules)
+
+        # Splice the rewritten tags in from the end so earlier offsets stay valid
+        for group in reversed(groups):
+            if not group["paths"]:
+                continue
+            first, last = group["tags"][0], group["tags"][-1]
+            if group["mode"] == "module":
+                target = self.renamed.get(group["paths"][0])
+                if target is None:
+                    continue
+            else:
+                target = self.bundle(page_dir, group["kind"], group["paths"])
+            url = posixpath.relpath(target, page_dir or ".")
+            attribute = "src" if group["kind"] == "js" else "href"
+            original = html[first["start"]:first["end"]]
+            tag = re.sub(rf"""((?<![\w-]){attribute}\s*=\s*)("[^"]*"|'[^']*'|[^\s>]+)""",
+                         lambda m: f'{m.group(1)}"{url}"', original, count=1)
+            html = html[:first["start"]] + tag + html[last["end"]:]
+        self.write(page, html.encode("utf-8"))
+        self.summary["html"] += 1
+
+    def run(self) -> None:
+        pages = [path for path in self.files if Path(path).suffix.lower() in (".html", ".htm")]
+        for page in pages:
+            self.build_page(page)
+        # Minified copies under the original names, for anything loaded dynamically
+        for path in self.files:
+            suffix = Path(path).suffix.lower()
+            if suffix in JS_SUFFIXES or suffix in CSS_SUFFIXES:
+                self.write(path, self.minify(path).encode("utf-8"))
+            elif path not in self.written:
+                link_or_copy(self.files[path], self.dist / path)
+        self.write(MANIFEST_NAME, json.dumps(self.renamed, indent=2, sort_keys=True).encode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+#  Precompression
+# ---------------------------------------------------------------------------
+def _compress(path: Path) -> Tuple[int, int, int]:
+    """Write .gz (and .br) next to ``path`` when smaller; return the three sizes."""
+    data = path.read_bytes()
+    sizes = [len(data), 0, 0]
+    variants = [(".gz", gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=BROTLI_QUALITY)))
+    for index, (suffix, compressed) in enumerate(variants, start=1):
+        if len(compressed) < len(data):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+            sizes[index] = len(compressed)
+    return tuple(sizes)
+
+
+def precompress(dist: Path, workers: Optional[int] = None) -> Dict[str, int]:
+    targets = [path for path in dist.rglob("*") if path.is_file()
+               and path.suffix.lower() in COMPRESSIBLE_SUFFIXES and path.stat().st_size >= COMPRESS_MIN_BYTES]
+    totals = {"compressed": 0, "bytes": 0, "gzip_bytes": 0, "brotli_bytes": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers or BUILD_WORKERS)) as pool:
+        for raw, gz, br in pool.map(_compress, targets):
+            totals["compressed"] += 1
+            totals["bytes"] += raw
+            totals["gzip_bytes"] += gz or raw
+            totals["brotli_bytes"] += br or gz or raw
+    return totals
+
+
+def build_game(
+    spec: Optional[FileStructureSpec] = None,
+    game_dir: Union[str, Path] = "./Game",
+    workers: Optional[int] = None,
+) -> BuildRun:
+    """Bundle, minify, hash and precompress ``game_dir`` into ``game_dir``/dist."""
+    game_dir = Path(game_dir)
+    dist = game_dir / DIST_DIR
+    staging = Path(tempfile.mkdtemp(dir=game_dir, prefix=".dist-"))
+    try:
+        builder = _Builder(game_dir, staging, spec)
+        builder.run()
+        summary: Dict[str, Any] = {**builder.summary, **precompress(staging, workers),
+                                   "brotli": brotli is not None, "files": len(builder.files)}
+        staging.chmod(0o755)
+        if dist.exists():
+            retired = Path(tempfile.mkdtemp(dir=game_dir, prefix=".dist-old-"))
+            dist.rename(retired / DIST_DIR)
+            staging.rename(dist)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            staging.rename(dist)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return BuildRun(builder.renamed, summary)
@@ -0,0 +1,124 @@
+"""
+Phase checkpoints for resumable GameFlow runs.
+
+Each phase output and each generated file is written to the run directory
+under a key derived from a hash of that phase's inputs. A resumed run loads a
+checkpoint only when the key matches, so anything whose inputs changed is
+regenerated while everything else is skipped.
+
+Layout of a run directory::
+
+    runs/<run id>/
+        run.json                      # concept inputs the run was started with
+        phases/<phase>-<key>.json     # one file per phase output
+        files/<key>.json              # one file per generated code file
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+RUNS_ROOT = Path(os.getenv("RUNS_ROOT", "./runs"))
+LATEST_POINTER = "LATEST"
+
+
+def input_hash(*inputs: Any) -> str:
+    """Stable SHA-256 over JSON-serialisable inputs (pydantic models are dumped first)."""
+    normalised = [
+        item.model_dump(mode="json") if hasattr(item, "model_dump") else item
+        for item in inputs
+    ]
+    payload = json.dumps(normalised, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write ``text`` to ``path`` via a temp file + rename so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class RunCheckpoint:
+    """Read/write checkpoints for one run directory."""
+
+    def __init__(self, run_dir: str):
+        self.run_dir = Path(run_dir)
+
+    # ------------------------------------------------------------------
+    # Run metadata
+    # ------------------------------------------------------------------
+    @classmethod
+    def create(cls, inputs: Dict[str, Any], root: Path = RUNS_ROOT) -> "RunCheckpoint":
+        """Start a fresh run directory, record its inputs and mark it as the latest run."""
+        run_dir = root / time.strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while run_dir.exists():
+            run_dir = root / f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+            suffix += 1
+        checkpoint = cls(str(run_dir))
+        atomic_write_text(run_dir / "run.json", json.dumps(inputs, indent=2))
+        atomic_write_text(root / LATEST_POINTER, str(run_dir))
+        return checkpoint
+
+    @classmethod
+    def latest(cls, root: Path = RUNS_ROOT) -> Optional["RunCheckpoint"]:
+        """Return the most recently created run, if any."""
+        pointer = root / LATEST_POINTER
+        if not pointer.exists():
+            return None
+        run_dir = pointer.read_text(encoding="utf-8").strip()
+        return cls(run_dir) if run_dir and Path(run_dir).is_dir() else None
+
+    def run_inputs(self) -> Dict[str, Any]:
+        """Inputs recorded by ``create`` (empty if the run predates them)."""
+        path = self.run_dir / "run.json"
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    # ------------------------------------------------------------------
+    # Phase and file checkpoints
+    # ------------------------------------------------------------------
+    def _phase_path(self, phase: str, key: str) -> Path:
+        return self.run_dir / "phases" / f"{phase}-{key[:16]}.json"
+
+    def _file_path(self, key: str) -> Path:
+        return self.run_dir / "files" / f"{key[:24]}.json"
+
+    @staticmethod
+    def _read(path: Path, key: str) -> Optional[Any]:
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Guard against truncated-key collisions
+        return record["value"] if record.get("key") == key else None
+
+    def load_phase(self, phase: str, key: str) -> Optional[Any]:
+        return self._read(self._phase_path(phase, key), key)
+
+    def save_phase(self, phase: str, key: str, value: Any) -> None:
+        record = {"phase": phase, "key": key, "saved_at": time.time(), "value": value}
+        atomic_write_text(self._phase_path(phase, key), json.dumps(record, indent=2))
+
+    def load_file(self, key: str) -> Optional[str]:
+        return self._read(self._file_path(key), key)
+
+    def save_file(self, filename: str, key: str, content: str) -> None:
+        record = {"filename": filename, "key": key, "saved_at": time.time(), "value": content}
+        atomic_write_text(self._file_path(key), json.dumps(record))
@@ -1,26 +1,49 @@
-import base64
-from openai import OpenAI
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai import LLM
+from unemploymentstudios.llm_cache import CachedLLM
 from crewai_tools import DallETool
 from crewai.tools import BaseTool
 import os
 import re
 import json
-import pathlib
-import requests
-from typing import Any, List, Optional, Type
-import dotenv
+from typing import Any, Optional, Type
+
+from unemploymentstudios.metrics import metrics
+from unemploymentstudios.types import AssetManifest
+from unemploymentstudios.asset_store import link_or_copy
+from unemploymentstudios.tools import sound_search
+from unemploymentstudios.tools.asset_cache import image_cache
+from unemploymentstudios.tools.clients import clients
+from unemploymentstudios.tools.downloads import adownload_to_file, download_to_file, write_b64_file
 
 from bs4 import BeautifulSoup    
 # ---------------------------------------------------------------------------
 #  SaveDalleImageTool – generates + downloads image to ./assets/images/
 # ---------------------------------------------------------------------------
-import requests, os, pathlib, json, uuid
+import os, json, uuid
 from typing import Any
 
+def run_coroutine(coro):
+    """
+    Run ``coro`` to completion from synchronous code (the asset worker pool),
+    even when the calling thread already runs an event loop.
+    """
+    async def run_and_close():
+        try:
+            return await coro
+        finally:
+            await clients.aclose_loop()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_and_close())
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, run_and_close()).result()
+
 # --------------------------- The actual Tool class ---------------------------
 class GenerateAndDownloadImageSchema(BaseModel):
     # print("GenerateAndDownloadImageSchema RUNNING")
@@ -46,76 +69,175 @@ class GenerateAndDownloadImageTool(BaseTool):
 
     # -------------------- sync entry‑point CrewAI will call ------------------
     def _run(self, **kwargs) -> Any:
-        prompt          = kwargs["prompt"]
-        file_name       = kwargs["file_name"]
-        size            = kwargs.get("size", "1024x1024")
-        response_format = kwargs.get("response_format", "url")
-        model           = kwargs.get("model", "dall-e-3")
-        n               = kwargs.get("n", 1)
-
-        # -- Make sure OPENAI_API_KEY is set
-        dotenv.load_dotenv(override=True)
-        if not os.getenv("OPENAI_API_KEY"):
-            return "OPENAI_API_KEY is not set in the environment."
-
-        # -- Configure client
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-        # -- Call DALL·E
-        response = client.images.generate(
-            prompt=prompt,
-            n=n,
-            size=size,
-            response_format=response_format,
-            model=model,
-        )
-        response_dict = response.model_dump(mode="python")
-
-        if not response_dict or "data" not in response_dict or len(response_dict["data"]) == 0:
-            return "No image data returned from DALL·E."
-
-        # ---------------------------------------------------------
-        # Depending on the response format, extract the image data
-        # ---------------------------------------------------------
-        if response_format == "url":
-            image_url = response_dict["data"][0]["url"]
-
-            # Download the image from the URL
-            r = requests.get(image_url, timeout=30)
-            r.raise_for_status()
-
-            # Ensure folder exists
-            pathlib.Path(file_name).expanduser().parent.mkdir(parents=True, exist_ok=True)
-            with open(file_name, "wb") as f:
-                f.write(r.content)
-
-            return json.dumps(
-                {
-                    "message": f"Image generated and saved as {file_name}.",
-                    "url": image_url,
-                },
-                indent=2,
+        with metrics.span("tool", self.name) as span:
+            prompt          = kwargs["prompt"]
+            file_name       = kwargs["file_name"]
+            size            = kwargs.get("size", "1024x1024")
+            response_format = kwargs.get("response_format", "url")
+            model           = kwargs.get("model", "dall-e-3")
+            n               = kwargs.get("n", 1)
+
+            # -- Serve repeated prompts from the image cache
+            cache_key = image_cache.make_key(model, size, prompt, response_format)
+            cached = self._from_cache(cache_key, file_name)
+            if cached is not None:
+                span["cached"] = True
+                return cached
+
+            # -- Shared, pooled client (loads .env once per process); OpenAI()
+            #    raises without a key, so check it first
+            if not clients.openai_api_key():
+                return "OPENAI_API_KEY is not set in the environment."
+            client = clients.openai()
+
+            # -- Call DALL·E
+            response = client.images.generate(
+                prompt=prompt,
+                n=n,
+                size=size,
+                response_format=response_format,
+                model=model,
             )
+            response_dict = response.model_dump(mode="python")
+
+            if not response_dict or "data" not in response_dict or len(response_dict["data"]) == 0:
+                return "No image data returned from DALL·E."
+
+            # ---------------------------------------------------------
+            # Depending on the response format, extract the image data
+            # ---------------------------------------------------------
+            if response_format == "url":
+                image_url = response_dict["data"][0]["url"]
+
+                # Stream the image from the URL straight into place
+                download = download_to_file(image_url, file_name, timeout=30)
+                span["retries"] = download.retries
+                span["bytes_downloaded"] = download.size
+
+                return self._to_cache(
+                    cache_key,
+                    file_name,
+                    {
+                        "message": f"Image generated and saved as {file_name}.",
+                        "url": image_url,
+                        "sha256": download.sha256,
+                    },
+                    prompt=prompt, model=model, size=size, response_format=response_format,
+                )
+
+            else:  # b64_json
+                download = write_b64_file(response_dict["data"][0]["b64_json"], file_name)
+
+                return self._to_cache(
+                    cache_key,
+                    file_name,
+                    {
+                        "message": f"Image generated (base64) and saved as {file_name}",
+                        "sha256": download.sha256,
+                    },
+                    prompt=prompt, model=model, size=size, response_format=response_format,
+                )
+
+    # ------------------------- prompt-keyed image cache ----------------------
+    @staticmethod
+    def _from_cache(cache_key: str, file_name: str) -> Optional[str]:
+        """Link a cached image to ``file_name`` and describe it, or None on a miss."""
+        if not image_cache.enabled:
+            return None
+        record = image_cache.fetch(cache_key, file_name)
+        if record is None:
+            return None
+        return json.dumps(
+            {
+                "message": f"Image served from cache and saved as {file_name}.",
+                "url": record.get("url"),
+                "sha256": record.get("sha256"),
+                "cache": {"hit": True, "key": cache_key, "created": record.get("created"),
+                          "prompt": record.get("prompt"), "model": record.get("model")},
+            },
+            indent=2,
+        )
 
-        else:  # b64_json
-            b64_data    = response_dict["data"][0]["b64_json"]
-            image_bytes = b64_data.encode("utf-8")
-            decoded     = base64.decodebytes(image_bytes)
-
-            pathlib.Path(file_name).expanduser().parent.mkdir(parents=True, exist_ok=True)
-            with open(file_name, "wb") as f:
-                f.write(decoded)
-
-            return json.dumps(
-                {
-                    "message": f"Image generated (base64) and saved as {file_name}",
-                },
-                indent=2,
+    @staticmethod
+    def _to_cache(cache_key: str, file_name: str, result: dict, **provenance: Any) -> str:
+        """Store a freshly generated image and add cache provenance to its result."""
+        cache = {"hit": False, "key": cache_key, "stored": False}
+        if image_cache.enabled:
+            try:
+                image_cache.store(cache_key, file_name, {**provenance, "url": result.get("url"),
+                                                         "sha256": result.get("sha256")})
+                cache["stored"] = True
+            except OSError as e:
+                cache["error"] = str(e)
+        result["cache"] = cache
+        return json.dumps(result, indent=2)
+
+    # ------------- native async entry-point (no thread per image) -----------
+    async def _arun(self, **kwargs) -> Any:
+        with metrics.span("tool", self.name, mode="async") as span:
+            prompt          = kwargs["prompt"]
+            file_name       = kwargs["file_name"]
+            size            = kwargs.get("size", "1024x1024")
+            response_format = kwargs.get("response_format", "url")
+            model           = kwargs.get("model", "dall-e-3")
+            n               = kwargs.get("n", 1)
+
+            cache_key = image_cache.make_key(model, size, prompt, response_format)
+            cached = await asyncio.to_thread(self._from_cache, cache_key, file_name)
+            if cached is not None:
+                span["cached"] = True
+                return cached
+
+            if not clients.openai_api_key():
+                return "OPENAI_API_KEY is not set in the environment."
+            client = clients.async_openai()
+
+            response = await client.images.generate(
+                prompt=prompt,
+                n=n,
+                size=size,
+                response_format=response_format,
+                model=model,
             )
+            response_dict = response.model_dump(mode="python")
+
+            if not response_dict or "data" not in response_dict or len(response_dict["data"]) == 0:
+                return "No image data returned from DALL·E."
+
+            if response_format == "url":
+                image_url = response_dict["data"][0]["url"]
+                download = await adownload_to_file(image_url, file_name, timeout=30)
+                span["retries"] = download.retries
+                span["bytes_downloaded"] = download.size
+
+                return await asyncio.to_thread(
+                    self._to_cache,
+                    cache_key,
+                    file_name,
+                    {
+                        "message": f"Image generated and saved as {file_name}.",
+                        "url": image_url,
+                        "sha256": download.sha256,
+                    },
+                    prompt=prompt, model=model, size=size, response_format=response_format,
+                )
+
+            else:  # b64_json
+                download = await asyncio.to_thread(
+                    write_b64_file, response_dict["data"][0]["b64_json"], file_name
+                )
+
+                return await asyncio.to_thread(
+                    self._to_cache,
+                    cache_key,
+                    file_name,
+                    {
+                        "message": f"Image generated (base64) and saved as {file_name}",
+                        "sha256": download.sha256,
+                    },
+                    prompt=prompt, model=model, size=size, response_format=response_format,
+                )
 
-    # async wrapper for CrewAI compliance
-    async def _arun(self, **kwargs) -> Any:
-        return self._run(**kwargs)
 class SearchAndSaveSoundToolArgs(BaseModel):
     """Arguments accepted by SearchAndSaveSoundTool."""
     query: str = Field(..., description="Search text for the Freesound query")
@@ -127,16 +249,30 @@ class SearchAndSaveSoundToolArgs(BaseModel):
         5,
         description="Maximum number of results to consider (the first hit will be downloaded)"
     )
+    min_duration: Optional[float] = Field(
+        None,
+        description="Shortest acceptable clip in seconds; setting any limit evaluates all results"
+    )
+    max_duration: Optional[float] = Field(
+        None,
+        description="Longest acceptable clip in seconds"
+    )
+    max_bytes: Optional[int] = Field(
+        None,
+        description="Largest acceptable preview file in bytes"
+    )
 
 
 class SearchAndSaveSoundTool(BaseTool):
     """
-    Searches Freesound for the query, scrapes the first result using BeautifulSoup,
-    and downloads the preview audio file.
+    Searches Freesound for the query and downloads the preview audio file of
+    the first result, or of the best-ranked result that meets the duration
+    and size limits. Searches and previews are cached between runs.
     """
     name: str = "search_and_save_sound"
     description: str = (
         "Search Freesound for an audio clip and save the first preview to disk. "
+        "Optionally pass min_duration/max_duration/max_bytes to pick among the top results. "
         "Returns a JSON blob describing the saved file."
     )
     args_schema = SearchAndSaveSoundToolArgs
@@ -144,46 +280,96 @@ class SearchAndSaveSoundTool(BaseTool):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    @staticmethod
+    def _saved(preview, output_path: str, searched_cached: bool, evaluated: int) -> str:
+        link_or_copy(preview.path, output_path)
+        return json.dumps({
+            "file": output_path,
+            "sha256": preview.sha256,
+            "original_url": preview.sound.get("url"),
+            "preview_url": preview.url,
+            "duration": preview.sound.get("duration"),
+            "candidates_evaluated": evaluated,
+            "cache": {"search": searched_cached, "preview": preview.cached},
+            "message": f"Audio saved as {output_path}"
+        }, indent=2)
+
     def _run(
         self,
         *,
         query: str,
         output_path: str,
         max_results: int = 5,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_bytes: Optional[int] = None,
         **_
     ) -> Any:
-        import os
-        import json
-        from freesound import FreesoundClient
-        import requests
-
-        api_key = os.getenv("FREESOUND_API_KEY")
-        if not api_key:
-            return json.dumps({"error": "FREESOUND_API_KEY not set in environment."})
-        client = FreesoundClient()
-        client.set_token(api_key, "token")
+        with metrics.span("tool", self.name) as span:
+            api_key = os.getenv("FREESOUND_API_KEY")
+            if not api_key:
+                return json.dumps({"error": "FREESOUND_API_KEY not set in environment."})
+
+            try:
+                results, span["retries"], searched_cached = sound_search.search(api_key, query, max_results)
+                if not results:
+                    return json.dumps({"error": "No results found."})
+                if sound_search.constrained(min_duration, max_duration, max_bytes):
+                    candidates = sound_search.fetch_candidates(results)
+                else:
+                    candidates = sound_search.fetch_candidates(results[:1])
+                preview = sound_search.select_preview(candidates, min_duration, max_duration, max_bytes)
+                if preview is None:
+                    raise candidates[0]
+                span["retries"] += sum(c.retries for c in candidates if isinstance(c, sound_search.Preview))
+                span["bytes_downloaded"] = sum(
+                    c.size for c in candidates if isinstance(c, sound_search.Preview) and not c.cached
+                )
+                return self._saved(preview, output_path, searched_cached, len(candidates))
+            except Exception as e:
+                span["status"] = "error"
+                return json.dumps({"error": f"Failed to fetch or save audio: {e}"})
+
+    async def _arun(
+        self,
+        *,
+        query: str,
+        output_path: str,
+        max_results: int = 5,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        **_
+    ) -> Any:
+        """
+        Async variant on the event loop's shared client, so searches and
+        preview downloads can overlap on one event loop.
+        """
+        with metrics.span("tool", self.name, mode="async") as span:
+            api_key = os.getenv("FREESOUND_API_KEY")
+            if not api_key:
+                return json.dumps({"error": "FREESOUND_API_KEY not set in environment."})
+
+            try:
+                results, span["retries"], searched_cached = await sound_search.asearch(api_key, query, max_results)
+                if not results:
+                    return json.dumps({"error": "No results found."})
+                if sound_search.constrained(min_duration, max_duration, max_bytes):
+                    candidates = await sound_search.afetch_candidates(results)
+                else:
+                    candidates = await sound_search.afetch_candidates(results[:1])
+                preview = sound_search.select_preview(candidates, min_duration, max_duration, max_bytes)
+                if preview is None:
+                    raise candidates[0]
+                span["retries"] += sum(c.retries for c in candidates if isinstance(c, sound_search.Preview))
+                span["bytes_downloaded"] = sum(
+                    c.size for c in candidates if isinstance(c, sound_search.Preview) and not c.cached
+                )
+                return await asyncio.to_thread(self._saved, preview, output_path, searched_cached, len(candidates))
+            except Exception as e:
+                span["status"] = "error"
+                return json.dumps({"error": f"Failed to fetch or save audio: {e}"})
 
-        try:
-            results = client.text_search(query=query, fields="id,name,previews,url", page_size=max_results)
-            if not results or len(results) == 0:
-                return json.dumps({"error": "No results found."})
-            sound = results[0]
-            preview_url = sound.previews.preview_hq_mp3 or sound.previews.preview_lq_mp3
-            if not preview_url:
-                return json.dumps({"error": "No preview audio found for this sound."})
-            audio_data = requests.get(preview_url, timeout=15)
-            audio_data.raise_for_status()
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(audio_data.content)
-            return json.dumps({
-                "file": output_path,
-                "original_url": sound.url,
-                "preview_url": preview_url,
-                "message": f"Audio saved as {output_path}"
-            }, indent=2)
-        except Exception as e:
-            return json.dumps({"error": f"Failed to fetch or save audio: {e}"})
 @CrewBase
 class AssetGenerationCrew:
     """Asset Generation Crew for game development"""
@@ -191,7 +377,7 @@ class AssetGenerationCrew:
     tasks_config = "config/tasks.yaml"
 
     # Basic configuration
-    llm = LLM(model="gpt-4o")
+    llm = CachedLLM(model="gpt-4o")
 
     # --------------------------------------------------
     # AGENTS
@@ -224,22 +410,6 @@ class AssetGenerationCrew:
             llm=self.llm
         )
     @agent
-    def image_generator(self) -> Agent:
-        return Agent(
-            config=self.agents_config["image_generator"],
-            tools=[GenerateAndDownloadImageTool()],   # now saves files
-            llm=self.llm,
-        )
-    @agent
-    def audio_sourcer(self) -> Agent:
-        """Fetches & normalises audio via the custom Freesound tool."""
-        fs_tool = SearchAndSaveSoundTool()      # uses the code you supplied
-        return Agent(
-            config=self.agents_config["audio_sourcer"],
-            tools=[fs_tool],
-            llm=self.llm,
-        )
-    @agent
     def asset_integrator(self) -> Agent:
         """Agent that pipes finished assets into the codebase / repo."""
         return Agent(config=self.agents_config["asset_integrator"], llm=self.llm)
@@ -302,153 +472,24 @@ class AssetGenerationCrew:
             ]
         )
     @task
-    def generate_visual_assets(self) -> Task:
-        """Force image generation by ensuring the tools are used directly"""
-        task = Task(
-            config=self.tasks_config["generate_visual_assets"],
-            context=[self.analyze_asset_requirements()],
-        )
-        
-        # Override the task execution method to ensure tools are used
-        original_execute = task.execute
-        
-        def ensure_tool_usage(*args, **kwargs):
-            # First, run the normal task execution
-            result = original_execute(*args, **kwargs)
-            
-            # Check if any images were created
-            import os
-            import json
-            
-            # If no images were created during the normal execution, create some fallback images
-            if not os.path.exists("./assets/images") or len(os.listdir("./assets/images")) <= 1:  # Only the test_direct.png exists
-                print("No images created by agent! Generating fallback images...")
-                
-                # Get the tools from the image_generator agent
-                image_tool = None
-                for tool in self.image_generator().tools:
-                    if tool.name == "generate_and_download_image":
-                        image_tool = tool
-                        break
-                
-                if image_tool:
-                    # Create basic game images directly
-                    basic_images = [
-                        ("main_character", "A hero character for a video game with determined expression, detailed pixel art style"),
-                        ("enemy", "A menacing enemy character for a video game, detailed pixel art style"),
-                        ("background", "A beautiful game background landscape, pixel art style"),
-                        ("ui_button", "A stylish game UI button in pixel art style"),
-                        ("logo", "A game logo with stylized text, pixel art style")
-                    ]
-                    
-                    manifest = {}
-                    for name, prompt in basic_images:
-                        try:
-                            filename = f"./assets/images/{name}.png"
-                            print(f"Directly generating image: {filename} with prompt: {prompt}")
-                            result_str = image_tool._run(prompt=prompt, file_name=filename)
-                            result_json = json.loads(result_str)
-                            manifest[name] = {
-                                "file": filename,
-                                "prompt": prompt,
-                                "width": 1024,
-                                "height": 1024
-                            }
-                            print(f"Generated image: {filename}")
-                        except Exception as e:
-                            print(f"Error generating image {name}: {e}")
-                    
-                    # Save manifest
-                    os.makedirs("./assets", exist_ok=True)
-                    with open("./assets/manifest_images.json", "w") as f:
-                        json.dump(manifest, f, indent=2)
-                    
-                    # Update result with information about the directly generated images
-                    result += "\n\nFallback images were generated directly: " + ", ".join([name for name, _ in basic_images])
-            
-            return result
-        
-        # Replace the execute method with our enhanced version
-        task.execute = ensure_tool_usage
-        return task
-
-    @task
-    def source_audio_assets(self) -> Task:
-        """Force audio generation by ensuring the tools are used directly"""
-        task = Task(
-            config=self.tasks_config["source_audio_assets"],
-            context=[self.analyze_asset_requirements()],
+    def plan_asset_jobs(self) -> Task:
+        """
+        The image and audio jobs as a validated manifest; ``asset_jobs``
+        executes them after the crew, outside the agent loop.
+        """
+        return Task(
+            config=self.tasks_config["plan_asset_jobs"],
+            context=[self.finalize_assets()],
+            output_pydantic=AssetManifest,
         )
-        
-        # Override the task execution method to ensure tools are used
-        original_execute = task.execute
-        
-        def ensure_audio_tool_usage(*args, **kwargs):
-            # First, run the normal task execution
-            result = original_execute(*args, **kwargs)
-            
-            # Check if any audio files were created
-            import os
-            import json
-            
-            # If no audio files were created during the normal execution, create some fallback sounds
-            if not os.path.exists("./assets/audio") or len(os.listdir("./assets/audio")) <= 1:  # Only the test_direct.mp3 exists
-                print("No audio files created by agent! Generating fallback audio...")
-                
-                # Get the tools from the audio_sourcer agent
-                audio_tool = None
-                for tool in self.audio_sourcer().tools:
-                    if tool.name == "search_and_save_sound":
-                        audio_tool = tool
-                        break
-                
-                if audio_tool:
-                    # Create basic game sounds directly
-                    basic_sounds = [
-                        ("background_music", "game background music"),
-                        ("jump_sound", "game jump sound effect"),
-                        ("collect_item", "game collect item sound")
-                    ]
-                    
-                    manifest = {}
-                    for name, query in basic_sounds:
-                        try:
-                            filename = f"./assets/audio/{name}.mp3"
-                            print(f"Directly searching for audio: {filename} with query: {query}")
-                            result_str = audio_tool._run(query=query, output_path=filename)
-                            result_json = json.loads(result_str)
-                            manifest[name] = {
-                                "file": filename,
-                                "query": query,
-                                "original_url": result_json.get("original_url", ""),
-                                "preview_url": result_json.get("preview_url", "")
-                            }
-                            print(f"Retrieved audio: {filename}")
-                        except Exception as e:
-                            print(f"Error retrieving audio {name}: {e}")
-                    
-                    # Save manifest
-                    os.makedirs("./assets", exist_ok=True)
-                    with open("./assets/manifest_audio.json", "w") as f:
-                        json.dump(manifest, f, indent=2)
-                    
-                    # Update result with information about the directly generated audio
-                    result += "\n\nFallback audio files were generated directly: " + ", ".join([name for name, _ in basic_sounds])
-            
-            return result
-        
-        # Replace the execute method with our enhanced version
-        task.execute = ensure_audio_tool_usage
-        return task
 
     @task
     def integrate_assets(self) -> Task:
         return Task(
             config=self.tasks_config["integrate_assets"],
             context=[
-                self.generate_visual_assets(),
-                self.source_audio_assets(),
                 self.finalize_assets(),
+                self.plan_asset_jobs(),
             ],
         )
 
@@ -464,8 +505,6 @@ class AssetGenerationCrew:
                 self.graphic_designer(),
                 self.sound_designer(),
                 self.ui_designer(),
-                self.image_generator(),  # Explicitly include image generator
-                self.audio_sourcer(),    # Explicitly include audio sourcer
                 self.asset_integrator()
             ],
             tasks=[
@@ -476,8 +515,7 @@ class AssetGenerationCrew:
                 self.create_sound_effects(),
                 self.create_background_music(),
                 self.finalize_assets(),
-                self.generate_visual_assets(),  # Explicitly include visual asset generation
-                self.source_audio_assets(),     # Explicitly include audio asset generation
+                self.plan_asset_jobs(),
                 self.integrate_assets()
             ],
             process=Process.sequential,
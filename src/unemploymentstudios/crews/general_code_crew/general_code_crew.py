@@ -1,6 +1,6 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai import LLM
+from unemploymentstudios.llm_cache import CachedLLM
 
 # Import Pydantic Types
 from unemploymentstudios.types import GameFile
@@ -16,7 +16,7 @@ class GeneralCodeCrew:
     tasks_config = "config/tasks.yaml"
 
     # Basic configuration
-    llm = LLM(model="gpt-4o")
+    llm = CachedLLM(model="gpt-4o")
 
     # Advanced configuration with detailed parameters
     '''
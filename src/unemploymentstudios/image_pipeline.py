@@ -0,0 +1,312 @@
+"""
+Post-processing for the organised images in Game/assets/images.
+
+DALL·E returns 1024x1024 PNGs of roughly 1 MB each, far larger than a game
+sprite needs. ``process_images`` runs after the assets are organised and
+writes, under Game/assets/optimized/:
+
+    images/<name>.png|.webp       every image downscaled to its target size
+    atlas/sprites-<n>.png|.webp   sprites and UI elements packed into texture atlases
+    atlas/sprites-<n>.json        frame map (TexturePacker "hash" format, as loaded
+                                  by Phaser and PixiJS); the .webp page shares it
+
+Backgrounds are only resized; sprites and UI elements are also packed.
+Resizing and atlas composition run in a process pool across CPU cores, and
+every output is kept in ``processed_cache`` under a hash of its input and
+settings, so unchanged images are linked into place on the next run.
+
+Pillow is optional; without it this stage is skipped.
+
+Settings (environment):
+    IMAGE_SPRITE_SIZE       longest side of character/object sprites (default 128)
+    IMAGE_UI_SIZE           longest side of UI elements (default 256)
+    IMAGE_BACKGROUND_SIZE   longest side of backgrounds (default 1024)
+    IMAGE_ATLAS_SIZE        atlas page size limit (default 2048)
+    IMAGE_ATLAS_PADDING     pixels between atlas frames (default 2)
+    IMAGE_WEBP_QUALITY      WebP quality, 0-100 (default 85)
+    IMAGE_PIPELINE_WORKERS  processes (default: CPU count)
+"""
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from unemploymentstudios.asset_store import file_sha256
+from unemploymentstudios.checkpoint import atomic_write_text
+from unemploymentstudios.tools.asset_cache import processed_cache
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None
+
+# Bump when the processing below changes, so cached outputs are not reused
+PIPELINE_VERSION = 1
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+TARGET_SIZES = {
+    "sprite": int(os.getenv("IMAGE_SPRITE_SIZE", "128")),
+    "ui": int(os.getenv("IMAGE_UI_SIZE", "256")),
+    "background": int(os.getenv("IMAGE_BACKGROUND_SIZE", "1024")),
+}
+ATLAS_SIZE = int(os.getenv("IMAGE_ATLAS_SIZE", "2048"))
+ATLAS_PADDING = int(os.getenv("IMAGE_ATLAS_PADDING", "2"))
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "85"))
+IMAGE_PIPELINE_WORKERS = int(os.getenv("IMAGE_PIPELINE_WORKERS", "0")) or os.cpu_count() or 1
+
+BACKGROUND_WORDS = {"background", "backdrop", "bg", "landscape", "sky", "scenery", "environment", "panorama"}
+UI_WORDS = {"ui", "button", "icon", "hud", "menu", "logo", "panel", "title", "cursor", "bar"}
+
+Frame = Tuple[int, int, int, int]  # x, y, width, height
+
+
+class ImageRun(NamedTuple):
+    outputs: Dict[str, str]  # {output file name: path}
+    summary: Dict[str, Any]
+
+
+def classify(stem: str, category: Optional[str] = None) -> str:
+    """"background", "ui" or "sprite", from the file name and manifest category."""
+    words = set(re.split(r"[^a-z0-9]+", stem.lower()))
+    if words & BACKGROUND_WORDS:
+        return "background"
+    if category == "ui" or words & UI_WORDS:
+        return "ui"
+    return "sprite"
+
+
+def fit(width: int, height: int, max_side: int) -> Tuple[int, int]:
+    """Scale down (never up) so the longest side is at most ``max_side``."""
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def pack(sizes: Dict[str, Tuple[int, int]], max_size: int, padding: int) -> List[Dict[str, Frame]]:
+    """
+    Shelf-pack frames, tallest first, into as many ``max_size`` square pages
+    as needed. Frames larger than a page are left out.
+    """
+    pages: List[Dict[str, Frame]] = []
+    page: Dict[str, Frame] = {}
+    x = y = shelf = 0
+    for name, (width, height) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if width > max_size or height > max_size:
+            continue
+        if x + width > max_size:
+            x, y, shelf = 0, y + shelf + padding, 0
+        if y + height > max_size:
+            pages.append(page)
+            page, x, y, shelf = {}, 0, 0, 0
+        page[name] = (x, y, width, height)
+        x += width + padding
+        shelf = max(shelf, height)
+    if page:
+        pages.append(page)
+    return pages
+
+
+def page_size(page: Dict[str, Frame]) -> Tuple[int, int]:
+    return max(x + w for x, _, w, _ in page.values()), max(y + h for _, y, _, h in page.values())
+
+
+def frame_map(page: Dict[str, Frame], image: str) -> Dict[str, Any]:
+    width, height = page_size(page)
+    return {
+        "frames": {
+            name: {
+                "frame": {"x": x, "y": y, "w": w, "h": h},
+                "rotated": False,
+                "trimmed": False,
+                "spriteSourceSize": {"x": 0, "y": 0, "w": w, "h": h},
+                "sourceSize": {"w": w, "h": h},
+            }
+            for name, (x, y, w, h) in sorted(page.items())
+        },
+        "meta": {"image": image, "format": "RGBA8888", "size": {"w": width, "h": height}, "scale": "1"},
+    }
+
+
+# ---------------------------------------------------------------------------
+#  Process-pool workers (module level so they can be pickled)
+# ---------------------------------------------------------------------------
+def _save(image: Any, dest: str, fmt: str, **options: Any) -> None:
+    """Save via a temp file and an atomic rename."""
+    directory = os.path.dirname(dest) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(dest)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        image.save(tmp, fmt, **options)
+        os.chmod(tmp, 0o644)  # served by a web server, unlike mkstemp's private default
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def _resize_image(src: str, max_side: int, png_dest: str, webp_dest: str, webp_quality: int) -> Tuple[int, int]:
+    with Image.open(src) as opened:
+        alpha = opened.mode in ("RGBA", "LA", "PA") or "transparency" in opened.info
+        image = opened.convert("RGBA" if alpha else "RGB")
+    size = fit(image.width, image.height, max_side)
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    _save(image, png_dest, "PNG", optimize=True)
+    _save(image, webp_dest, "WEBP", quality=webp_quality, method=6)
+    return size
+
+
+def _compose_atlas(
+    frames: List[Tuple[str, int, int]], size: Tuple[int, int], png_dest: str, webp_dest: str, webp_quality: int
+) -> None:
+    atlas = Image.new("RGBA", size, (0, 0, 0, 0))
+    for src, x, y in frames:
+        with Image.open(src) as frame:
+            atlas.paste(frame.convert("RGBA"), (x, y))
+    _save(atlas, png_dest, "PNG", optimize=True)
+    _save(atlas, webp_dest, "WEBP", quality=webp_quality, method=6)
+
+
+# ---------------------------------------------------------------------------
+#  Cache
+# ---------------------------------------------------------------------------
+def _cache_keys(**params: Any) -> Dict[str, str]:
+    return {
+        "png": processed_cache.make_key(format="png", version=PIPELINE_VERSION, **params),
+        "webp": processed_cache.make_key(format="webp", quality=WEBP_QUALITY, version=PIPELINE_VERSION, **params),
+    }
+
+
+def _from_cache(keys: Dict[str, str], dests: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+    """Link both cached variants into place and return the PNG's record, or None."""
+    if not processed_cache.enabled:
+        return None
+    records = [processed_cache.fetch(keys[fmt], dests[fmt]) for fmt in ("png", "webp")]
+    return records[0] if all(records) else None
+
+
+def _to_cache(keys: Dict[str, str], dests: Dict[str, Path], record: Dict[str, Any]) -> None:
+    if not processed_cache.enabled:
+        return
+    try:
+        for fmt in ("png", "webp"):
+            processed_cache.store(keys[fmt], dests[fmt], record)
+    except OSError as e:
+        print(f"  Warning: could not cache {dests['png'].name}: {e}")
+
+
+# ---------------------------------------------------------------------------
+#  Stage
+# ---------------------------------------------------------------------------
+def _manifest_categories(manifest_path: Path) -> Dict[str, str]:
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {Path(entry.get("file", name)).stem: entry.get("category", "")
+            for name, entry in manifest.items() if isinstance(entry, dict)}
+
+
+def process_images(
+    images_dir: Union[str, Path] = "./Game/assets/images",
+    output_dir: Union[str, Path] = "./Game/assets/optimized",
+    workers: Optional[int] = None,
+) -> ImageRun:
+    """Resize, atlas and compress every image in ``images_dir``."""
+    if Image is None:
+        print("  Pillow is not installed; skipping image post-processing.")
+        return ImageRun({}, {"skipped": True})
+
+    images_dir, output_dir = Path(images_dir), Path(output_dir)
+    resized_dir, atlas_dir = output_dir / "images", output_dir / "atlas"
+    resized_dir.mkdir(parents=True, exist_ok=True)
+    atlas_dir.mkdir(parents=True, exist_ok=True)
+    categories = _manifest_categories(images_dir.parent / "manifest_images.json")
+    sources = sorted(path for path in images_dir.iterdir() if path.is_file()
+                     and not path.name.startswith(".") and path.suffix.lower() in IMAGE_SUFFIXES) \
+        if images_dir.exists() else []
+
+    # bytes_out is the resized WebP total, comparable with the sources' bytes_in
+    summary = {"images": len(sources), "resized": 0, "atlases": 0, "cached": 0, "failed": 0,
+               "bytes_in": 0, "bytes_out": 0}
+    outputs: Dict[str, str] = {}
+    resized: Dict[str, Tuple[str, str, int, Tuple[int, int]]] = {}  # stem -> (kind, sha, max side, size)
+
+    # spawn: this runs beside code-generation threads, and forking a threaded
+    # process can deadlock the child on locks held at fork time
+    with ProcessPoolExecutor(max_workers=max(1, workers or IMAGE_PIPELINE_WORKERS),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        # 1. Downscale every image (cache hits are linked in place)
+        futures = {}
+        for src in sources:
+            kind = classify(src.stem, categories.get(src.stem))
+            max_side = TARGET_SIZES[kind]
+            sha = file_sha256(src)
+            summary["bytes_in"] += src.stat().st_size
+            keys = _cache_keys(stage="resize", sha256=sha, max_side=max_side)
+            dests = {"png": resized_dir / f"{src.stem}.png", "webp": resized_dir / f"{src.stem}.webp"}
+            record = _from_cache(keys, dests)
+            if record is not None:
+                summary["cached"] += 1
+                resized[src.stem] = (kind, sha, max_side, (record["width"], record["height"]))
+                continue
+            futures[src.stem] = (kind, sha, max_side, keys, dests, pool.submit(
+                _resize_image, str(src), max_side, str(dests["png"]), str(dests["webp"]), WEBP_QUALITY))
+
+        for stem, (kind, sha, max_side, keys, dests, future) in futures.items():
+            try:
+                width, height = future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                print(f"  Warning: could not process image {stem}: {e}")
+                continue
+            summary["resized"] += 1
+            resized[stem] = (kind, sha, max_side, (width, height))
+            _to_cache(keys, dests, {"source_sha256": sha, "kind": kind, "width": width, "height": height})
+
+        for stem in resized:
+            for fmt in ("png", "webp"):
+                path = resized_dir / f"{stem}.{fmt}"
+                outputs[path.name] = str(path)
+
+        # 2. Pack sprites and UI elements into atlas pages
+        packable = {stem: size for stem, (kind, _, _, size) in resized.items() if kind != "background"}
+        pages = pack(packable, ATLAS_SIZE, ATLAS_PADDING)
+        atlas_futures = []
+        for number, page in enumerate(pages):
+            name = f"sprites-{number}"
+            dests = {"png": atlas_dir / f"{name}.png", "webp": atlas_dir / f"{name}.webp"}
+            keys = _cache_keys(stage="atlas", frames=[[stem, resized[stem][1], resized[stem][2], *frame]
+                                                      for stem, frame in sorted(page.items())])
+            atomic_write_text(atlas_dir / f"{name}.json", json.dumps(frame_map(page, dests["png"].name), indent=2))
+            os.chmod(atlas_dir / f"{name}.json", 0o644)
+            for path in (*dests.values(), atlas_dir / f"{name}.json"):
+                outputs[path.name] = str(path)
+            if _from_cache(keys, dests) is not None:
+                summary["cached"] += 1
+                continue
+            frames = [(str(resized_dir / f"{stem}.png"), x, y) for stem, (x, y, _, _) in page.items()]
+            atlas_futures.append((name, keys, dests, pool.submit(
+                _compose_atlas, frames, page_size(page), str(dests["png"]), str(dests["webp"]), WEBP_QUALITY)))
+
+        for name, keys, dests, future in atlas_futures:
+            try:
+                future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                print(f"  Warning: could not build atlas {name}: {e}")
+                continue
+            _to_cache(keys, dests, {"atlas": name})
+        summary["atlases"] = len(pages)
+
+    # 3. Drop outputs of images that no longer exist
+    for directory in (resized_dir, atlas_dir):
+        for path in directory.iterdir():
+            if path.is_file() and not path.name.startswith(".") and path.name not in outputs:
+                path.unlink()
+
+    summary["bytes_out"] = sum((resized_dir / f"{stem}.webp").stat().st_size for stem in resized)
+    return ImageRun(outputs, summary)
@@ -0,0 +1,219 @@
+"""
+A small JavaScript tokenizer for the generated game code.
+
+It is not a parser: it splits source into names, numbers, strings, template
+chunks, regex literals and punctuators, tells regex literals from divisions
+by the preceding token, and drops comments and whitespace (recording whether
+a line break came before each token). That is enough for the build's
+minifier and the static analyzers, which only need to see code as tokens
+with brackets matched.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+WORD_CHARS = re.compile(r"[\w$\\\u0080-\uffff]")
+WHITESPACE = " \t\r\n\f\v\u00a0\ufeff"
+# A "/" after one of these (or a keyword below) starts a regex literal, not a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+                  "throw", "case", "do", "else", "yield", "await"}
+# Longest first, so the scan takes the maximal munch
+PUNCTUATORS = sorted([
+    ">>>=", "...", "===", "!==", "**=", "<<=", ">>=", ">>>", "&&=", "||=", "??=",
+    "=>", "==", "!=", "<=", ">=", "&&", "||", "??", "?.", "++", "--", "+=", "-=",
+    "*=", "/=", "%=", "&=", "|=", "^=", "**", "<<", ">>",
+], key=len, reverse=True)
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+
+class Token(NamedTuple):
+    kind: str  # "name", "number", "string", "template", "regex" or "punct"
+    value: str
+    line: int  # 1-based
+    newline_before: bool
+
+
+class LexError(ValueError):
+    def __init__(self, message: str, line: int):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def is_word(char: str) -> bool:
+    return bool(char) and bool(WORD_CHARS.match(char))
+
+
+def scan_string(source: str, i: int) -> int:
+    """End index (exclusive) of the string literal starting at ``i``."""
+    quote, n = source[i], len(source)
+    i += 1
+    while i < n:
+        if source[i] == "\\":
+            i += 2
+        elif source[i] == quote or source[i] == "\n":
+            return i + 1
+        else:
+            i += 1
+    return n
+
+
+def scan_template(source: str, i: int) -> Tuple[int, bool]:
+    """
+    Scan template text from ``i`` (just after a backtick or a closing brace of
+    a substitution). Returns the end index and whether it stopped at ``${``.
+    """
+    n = len(source)
+    while i < n:
+        if source[i] == "\\":
+            i += 2
+        elif source[i] == "`":
+            return i + 1, False
+        elif source.startswith("${", i):
+            return i + 2, True
+        else:
+            i += 1
+    return n, False
+
+
+def scan_regex(source: str, i: int) -> Optional[int]:
+    """End index of the regex literal at ``i`` including flags, or None if it is not one."""
+    n, in_class = len(source), False
+    i += 1
+    while i < n:
+        char = source[i]
+        if char == "\n":
+            return None
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < n and is_word(source[i]):
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+def regex_allowed(previous: Optional[Token]) -> bool:
+    """Whether a "/" after ``previous`` starts a regex literal."""
+    if previous is None:
+        return True
+    if previous.kind == "punct":
+        return previous.value not in (")", "]", "}", "++", "--")
+    return previous.kind == "name" and previous.value in REGEX_KEYWORDS
+
+
+def tokenize(source: str, strict: bool = False) -> List[Token]:
+    """
+    Split ``source`` into tokens. With ``strict``, unterminated comments,
+    strings, templates and regexes raise ``LexError`` instead of running to
+    the end of the line or file.
+    """
+    tokens: List[Token] = []
+    templates: List[int] = []  # brace depth inside each open ${...} substitution
+    i, n, line, newline = 0, len(source), 1, False
+
+    def add(kind: str, end: int) -> None:
+        nonlocal i, line, newline
+        text = source[i:end]
+        tokens.append(Token(kind, text, line, newline))
+        line += text.count("\n")
+        i, newline = end, False
+
+    def fail(message: str) -> None:
+        if strict:
+            raise LexError(message, line)
+
+    while i < n:
+        char = source[i]
+        if char in WHITESPACE:
+            if char == "\n":
+                line += 1
+                newline = True
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end == -1:
+                fail("unterminated comment")
+                end = n
+            else:
+                end += 2
+            if "\n" in source[i:end]:
+                line += source.count("\n", i, end)
+                newline = True
+            i = end
+        elif char in "'\"":
+            end = scan_string(source, i)
+            if source[end - 1] != char or end - 1 == i:
+                fail("unterminated string")
+            add("string", end)
+        elif char == "`" or (char == "}" and templates and templates[-1] == 0):
+            if char == "}":
+                templates.pop()
+            end, substitution = scan_template(source, i + 1)
+            if not substitution and (source[end - 1] != "`" or end - 1 == i):
+                fail("unterminated template literal")
+            add("template", end)
+            if substitution:
+                templates.append(0)
+        elif char == "/" and regex_allowed(tokens[-1] if tokens else None):
+            end = scan_regex(source, i)
+            if end is None:
+                fail("unterminated regular expression")
+                add("punct", i + 1)
+            else:
+                add("regex", end)
+        elif char.isdigit() or (char == "." and i + 1 < n and source[i + 1].isdigit()):
+            end = i + 1
+            while end < n and (is_word(source[end]) or source[end] == "."
+                               or (source[end] in "+-" and source[end - 1] in "eE" and not source[i:end].startswith("0x"))):
+                end += 1
+            add("number", end)
+        elif is_word(char):
+            end = i + 1
+            while end < n and is_word(source[end]):
+                end += 1
+            add("name", end)
+        else:
+            punct = next((p for p in PUNCTUATORS if source.startswith(p, i)), char)
+            if punct == "?." and source[i + 2:i + 3].isdigit():  # a ?.5 : b
+                punct = "?"
+            if templates and punct in ("{", "}"):
+                templates[-1] += 1 if punct == "{" else -1
+            add("punct", i + len(punct))
+    if templates:
+        fail("unterminated template literal")
+    return tokens
+
+
+def match_brackets(tokens: List[Token], strict: bool = False) -> Dict[int, int]:
+    """
+    Map the index of every opening bracket to its closing one (and back).
+    With ``strict``, a mismatched or unclosed bracket raises ``LexError``.
+    """
+    pairs: Dict[int, int] = {}
+    stack: List[int] = []
+    for index, token in enumerate(tokens):
+        if token.kind != "punct":
+            continue
+        if token.value in BRACKETS:
+            stack.append(index)
+        elif token.value in (")", "]", "}"):
+            if not stack or BRACKETS[tokens[stack[-1]].value] != token.value:
+                if strict:
+                    raise LexError(f"unexpected '{token.value}'", token.line)
+                continue
+            opening = stack.pop()
+            pairs[opening], pairs[index] = index, opening
+    if stack and strict:
+        token = tokens[stack[-1]]
+        raise LexError(f"'{token.value}' is never closed", token.line)
+    return pairs
@@ -0,0 +1,255 @@
+"""
+Content-addressed on-disk cache for LLM responses, shared by every crew.
+
+Crews build ``CachedLLM`` instead of ``crewai.LLM``. Each completion is stored
+under a SHA-256 of the model, the rendered messages and the sampling
+parameters, so re-running a concept only pays for prompts that actually
+changed (for example the tasks downstream of an edited YAML task).
+
+Settings (environment):
+    LLM_CACHE_DIR       cache directory (default ./.llm_cache)
+    LLM_CACHE_MAX_MB    size cap; least recently used entries are evicted (default 512)
+    LLM_CACHE_MODE      "readwrite" (default), "replay" to fail on any miss,
+                        or "off" to bypass the cache entirely
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from crewai import LLM
+
+from unemploymentstudios.metrics import metrics
+
+# Sampling parameters that change the completion and therefore the cache key
+SAMPLING_PARAMS = [
+    "temperature",
+    "top_p",
+    "n",
+    "stop",
+    "max_tokens",
+    "max_completion_tokens",
+    "presence_penalty",
+    "frequency_penalty",
+    "logit_bias",
+    "response_format",
+    "seed",
+    "reasoning_effort",
+]
+
+CACHE_MODES = ("readwrite", "replay", "off")
+CACHE_COUNTERS = ("hits", "misses", "writes", "evictions")
+
+
+class LLMCacheMissError(RuntimeError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+class LLMResponseCache:
+    """Thread- and process-safe response store with an LRU size cap."""
+
+    def __init__(self, root: Union[str, Path], max_bytes: int, mode: str = "readwrite"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"LLM cache mode must be one of {CACHE_MODES}, got {mode!r}")
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        return cls(
+            root=os.path.abspath(os.getenv("LLM_CACHE_DIR", "./.llm_cache")),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            mode=os.getenv("LLM_CACHE_MODE", "readwrite").lower(),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    # ------------------------------------------------------------------
+    # Keys and paths
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(model: str, messages: Any, params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # bump recency for LRU eviction
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return record["response"]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"key": key, "model": model, "created": time.time(), "response": response})
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+        with self._lock:
+            self.writes += 1
+            if self._size is not None:
+                self._size += len(data.encode("utf-8"))
+        self._evict_if_needed()
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.root.glob("*/*.json"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue  # evicted by another process
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            if self._size <= self.max_bytes:
+                return
+            # Drop least recently used entries until we are 10% under the cap
+            target = int(self.max_bytes * 0.9)
+            for path, stat in sorted(self._entries(), key=lambda entry: entry[1].st_mtime):
+                if self._size <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                self._size -= stat.st_size
+                self.evictions += 1
+
+    def take_counts(self) -> Dict[str, int]:
+        """Return the hit/miss/write/eviction counts and reset them to zero."""
+        with self._lock:
+            counts = {name: getattr(self, name) for name in CACHE_COUNTERS}
+            for name in CACHE_COUNTERS:
+                setattr(self, name, 0)
+        return counts
+
+    def add_counts(self, counts: Dict[str, int]) -> None:
+        """Add counts taken in another process (see ``scheduling.CrewProcessPool``)."""
+        with self._lock:
+            for name in CACHE_COUNTERS:
+                setattr(self, name, getattr(self, name) + counts.get(name, 0))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+
+# One cache per process, shared by every crew
+llm_cache = LLMResponseCache.from_env()
+
+
+# crewAI's LLM.set_callbacks rewrites litellm's global callback lists unlocked
+_set_callbacks_lock = threading.Lock()
+
+
+class UsageCollector:
+    """
+    Token usage of a single completion. crewAI's ``LLM.call`` hands every
+    callback with ``log_success_event`` the usage of that call's response;
+    ``CachedLLM`` keeps collectors out of litellm's process-global callbacks,
+    so usage from other crews' calls never reaches them.
+    """
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def log_success_event(self, kwargs: Any, response_obj: Any, start_time: Any, end_time: Any) -> None:
+        usage = response_obj.get("usage") if isinstance(response_obj, dict) else getattr(response_obj, "usage", None)
+        if isinstance(usage, dict):
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+        elif usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+class CachedLLM(LLM):
+    """
+    Drop-in replacement for ``crewai.LLM`` that serves repeated prompts from
+    ``llm_cache``. Calls that execute functions (``available_functions``)
+    always go to the model, since their side effects cannot be replayed.
+    Token usage is taken from each call's own response and added to the
+    ``llm_call`` span and the running crew's span.
+    """
+
+    def _cache_params(self) -> Dict[str, Any]:
+        return {name: getattr(self, name, None) for name in SAMPLING_PARAMS}
+
+    def set_callbacks(self, callbacks: List[Any]) -> None:
+        callbacks = [callback for callback in callbacks if not isinstance(callback, UsageCollector)]
+        if callbacks:
+            with _set_callbacks_lock:
+                super().set_callbacks(callbacks)
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        with metrics.span("llm_call", self.model, cached=False) as span:
+            key = None
+            if llm_cache.enabled and not available_functions:
+                if isinstance(messages, str):
+                    messages = [{"role": "user", "content": messages}]
+                key = llm_cache.make_key(self.model, {"messages": messages, "tools": tools}, self._cache_params())
+
+                cached = llm_cache.get(key)
+                if cached is not None:
+                    span["cached"] = True
+                    return cached
+                if llm_cache.mode == "replay":
+                    raise LLMCacheMissError(f"No cached {self.model} response for prompt {key[:12]}")
+
+            usage = UsageCollector()
+            response = super().call(messages, tools, [*(callbacks or []), usage], available_functions)
+            span["prompt_tokens"] = usage.prompt_tokens
+            span["completion_tokens"] = usage.completion_tokens
+            metrics.add_usage(usage.prompt_tokens, usage.completion_tokens)
+            if key is not None and isinstance(response, str):
+                llm_cache.put(key, self.model, response)
+            return response
@@ -0,0 +1,219 @@
+"""
+Structured timing and token metrics for a GameFlow run.
+
+Everything records into the process-wide ``metrics`` recorder as *spans*:
+
+    flow_method  every @start/@listen method (via ``instrumented``)
+    crew         every crew kickoff, with the tokens of its own LLM calls
+    task         every task of a finished crew, timed by crewAI itself
+    llm_call     every CachedLLM call, with its tokens (``cached`` tells hits apart)
+    tool         every asset tool call, with bytes downloaded and retries
+    code_file    every file job, with the time it spent queued for a slot
+    asset_job    every manifest image/audio job, with its priority tier
+    asset_manifest  time until the first playable asset set was ready
+
+``write_json`` and ``write_prometheus`` dump the spans and their per-name
+totals at the end of the run.
+"""
+import asyncio
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+SPAN_COUNTERS = ["wall_seconds", "queue_seconds", "prompt_tokens", "completion_tokens", "retries", "bytes_downloaded"]
+
+# Span of the crew kicked off in the current context (see ``kickoff_crew``)
+_current_crew: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_crew", default=None)
+
+
+class MetricsRecorder:
+    """Thread-safe collection of finished spans."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running_crews: List[Dict[str, Any]] = []
+        self.spans: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans = []
+            self.started_at = time.time()
+
+    def record(self, kind: str, name: str, **fields: Any) -> Dict[str, Any]:
+        """Add an already-measured span."""
+        span = {counter: 0 for counter in SPAN_COUNTERS}
+        span.update({"kind": kind, "name": name, "status": "ok"})
+        span.update(fields)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def extend(self, spans: List[Dict[str, Any]]) -> None:
+        """Add spans recorded by another process (see ``scheduling.CrewProcessPool``)."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    @contextmanager
+    def span(self, kind: str, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block. The yielded dict can be updated in place with tokens,
+        bytes, retries or any other attribute before the block ends.
+        """
+        span = {counter: 0 for counter in SPAN_COUNTERS}
+        span.update({"kind": kind, "name": name, "status": "ok", "started_at": time.time()})
+        span.update(fields)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["status"] = "error"
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["wall_seconds"] = round(time.perf_counter() - start, 4)
+            with self._lock:
+                self.spans.append(span)
+
+    # ------------------------------------------------------------------
+    # crewAI helpers
+    # ------------------------------------------------------------------
+    def kickoff_crew(self, name: str, crew: Any, inputs: Dict[str, Any]) -> Any:
+        """
+        Kick off ``crew`` and record the crew span plus one span per task.
+        Tokens are summed from the crew's own LLM calls (``add_usage``), not
+        from CrewOutput.token_usage: crewAI counts those with litellm's
+        process-global callbacks, which also see every other crew's calls.
+        """
+        with self.span("crew", name, llm_requests=0) as span:
+            context_token = _current_crew.set(span)
+            with self._lock:
+                self._running_crews.append(span)
+            try:
+                output = crew.kickoff(inputs=inputs)
+            finally:
+                with self._lock:
+                    self._running_crews.remove(span)
+                _current_crew.reset(context_token)
+        for task in getattr(crew, "tasks", []):
+            duration = getattr(task, "execution_duration", None)
+            if duration is not None:
+                task_name = getattr(task, "name", None) or task.description[:60]
+                self.record("task", f"{name}:{task_name}", wall_seconds=round(duration, 4))
+        return output
+
+    def add_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Add the tokens of one LLM request to the crew that made it: the crew
+        of the calling context, or the only running crew for calls made on
+        threads crewAI starts itself (async tasks do not inherit the context).
+        """
+        span = _current_crew.get()
+        with self._lock:
+            if span is None and len(self._running_crews) == 1:
+                span = self._running_crews[0]
+            if span is None:
+                return
+            span["prompt_tokens"] += prompt_tokens
+            span["completion_tokens"] += completion_tokens
+            span["llm_requests"] += 1
+
+    def record_runner(self, kind: str, runner: Any) -> None:
+        """Record queue and run time of every job of a ``scheduling.BoundedRunner``."""
+        for job in runner.jobs:
+            if "started_at" not in job:
+                continue
+            finished = job.get("finished_at", time.perf_counter())
+            self.record(
+                kind,
+                job["name"],
+                wall_seconds=round(finished - job["started_at"], 4),
+                queue_seconds=round(job["started_at"] - job["queued_at"], 4),
+                status=job.get("status", "running"),
+            )
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def totals(self) -> Dict[str, Dict[str, Any]]:
+        """Per (kind, name) aggregates of every counter."""
+        totals: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            key = f"{span['kind']}/{span['name']}"
+            entry = totals.setdefault(
+                key,
+                {"kind": span["kind"], "name": span["name"], "count": 0, "errors": 0,
+                 **{counter: 0 for counter in SPAN_COUNTERS}},
+            )
+            entry["count"] += 1
+            entry["errors"] += span["status"] not in ("ok", "completed")
+            for counter in SPAN_COUNTERS:
+                entry[counter] += span.get(counter) or 0
+        return totals
+
+    def write_json(self, path: str) -> None:
+        with self._lock:
+            spans = list(self.spans)
+        payload = {"started_at": self.started_at, "totals": list(self.totals().values()), "spans": spans}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, default=str)
+
+    def write_prometheus(self, path: str, prefix: str = "unemploymentstudios") -> None:
+        """Write totals in the Prometheus text exposition format."""
+        metric_names = {
+            "count": ("spans_total", "Number of recorded spans"),
+            "errors": ("span_errors_total", "Spans that ended with an error"),
+            "wall_seconds": ("wall_seconds_total", "Wall-clock time spent"),
+            "queue_seconds": ("queue_seconds_total", "Time spent waiting for a worker slot"),
+            "prompt_tokens": ("prompt_tokens_total", "Prompt tokens consumed"),
+            "completion_tokens": ("completion_tokens_total", "Completion tokens produced"),
+            "retries": ("retries_total", "Retried requests"),
+            "bytes_downloaded": ("downloaded_bytes_total", "Bytes downloaded"),
+        }
+        totals = list(self.totals().values())
+        lines: List[str] = []
+        for field, (suffix, help_text) in metric_names.items():
+            metric = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for entry in totals:
+                labels = f'kind="{_escape(entry["kind"])}",name="{_escape(entry["name"])}"'
+                lines.append(f"{metric}{{{labels}}} {entry[field]}")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# One recorder per process; GameFlow resets it at the start of every run
+metrics = MetricsRecorder()
+
+
+def instrumented(method):
+    """
+    Record a ``flow_method`` span around a Flow method. Apply it *below*
+    ``@start``/``@listen`` so crewAI sees the wrapper's coroutine-ness.
+    """
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            with metrics.span("flow_method", method.__name__):
+                return await method(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with metrics.span("flow_method", method.__name__):
+            return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,376 @@
+"""
+Deterministic performance review of the generated JavaScript.
+
+The TestingQACrew's performance analyst only sees a handful of files and has
+to guess at bottlenecks. ``analyze_performance`` tokenizes every generated
+``.js`` file (with ``js_lexer``) and looks for the antipatterns that cost a
+browser game its frame rate:
+
+    frame-allocation   objects, arrays, closures and copying array methods
+                       created on every frame
+    dom-query-in-loop  DOM lookups and layout reads inside loops or frames
+    unbounded-array    arrays that grow every frame and are never trimmed
+    asset-load-in-loop images/sounds created or (re)loaded every frame
+
+"Every frame" means the bodies of functions passed to requestAnimationFrame
+or setInterval, functions with game-loop names (gameLoop, update, render,
+...) and, transitively, the functions they call by name. The checks are
+heuristic: they work on tokens with brackets matched, not on a full AST.
+
+Files are analysed in a process pool, and each becomes one ``QAFeedback``
+("passed" or "correction_needed") for the QA crew to build on.
+
+Settings (environment):
+    PERF_ANALYZER_WORKERS   processes (default: CPU count)
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from unemploymentstudios.js_lexer import Token, match_brackets, tokenize
+from unemploymentstudios.types import QAFeedback
+
+PERF_ANALYZER_WORKERS = int(os.getenv("PERF_ANALYZER_WORKERS", "0")) or os.cpu_count() or 1
+
+REVIEWER = "Static Performance Analyzer"
+# Lines listed per rule in a file's comments before "and N more"
+MAX_LINES_SHOWN = 6
+
+FRAME_SCHEDULERS = {"requestAnimationFrame", "setInterval"}
+GAME_LOOP_NAMES = {"gameloop", "mainloop", "loop", "update", "render", "draw", "tick", "animate",
+                   "step", "frame", "onframe", "updategame", "rendergame"}
+NOT_FUNCTION_NAMES = {"if", "for", "while", "switch", "catch", "with", "function", "return", "typeof"}
+ALLOCATING_METHODS = {"map", "filter", "slice", "concat", "bind", "flat", "flatMap", "split"}
+ALLOCATING_CALLS = {("Object", "assign"), ("Object", "keys"), ("Object", "values"), ("Object", "entries"),
+                    ("Array", "from"), ("JSON", "parse"), ("JSON", "stringify")}
+# Tokens after which "[" or "{" starts a literal rather than an index or a block
+LITERAL_PRECEDERS = {"=", "(", ",", "?", "||", "&&", "??", "return", "[", "+=", ":"}
+DOM_QUERIES = {"getElementById", "getElementsByClassName", "getElementsByTagName", "getElementsByName",
+               "querySelector", "querySelectorAll", "getBoundingClientRect", "getComputedStyle"}
+ASSET_CONSTRUCTORS = {"Image", "Audio"}
+ASSET_CALLS = {"fetch", "loadImage", "loadSound", "loadAudio"}
+REMOVING_METHODS = {"splice", "shift", "pop"}
+
+RULES = {
+    "frame-allocation": (
+        "allocates on every frame",
+        "Hoist or preallocate these objects (or pool them) so the frame loop does not feed the garbage collector.",
+    ),
+    "dom-query-in-loop": (
+        "queries the DOM or reads layout inside a loop",
+        "Look elements up once at start-up and cache them; batch layout reads outside the loop.",
+    ),
+    "unbounded-array": (
+        "grows an array every frame without ever removing from it",
+        "Remove dead entries (splice/filter or swap-and-pop) or cap the array so memory stays bounded.",
+    ),
+    "asset-load-in-loop": (
+        "creates or loads images/sounds inside the frame loop",
+        "Preload assets once before the loop starts and reuse the loaded objects.",
+    ),
+}
+
+Range = Tuple[int, int]  # token indices of an opening and its closing brace
+
+
+# ---------------------------------------------------------------------------
+#  Structure
+# ---------------------------------------------------------------------------
+def _value(tokens: List[Token], index: int) -> str:
+    return tokens[index].value if 0 <= index < len(tokens) else ""
+
+
+def _function_bodies(tokens: List[Token], pairs: Dict[int, int]) -> Dict[str, List[Range]]:
+    """Named function, method and arrow-function bodies, by name."""
+    bodies: Dict[str, List[Range]] = {}
+
+    def body_after(open_paren: int, arrow: bool) -> Optional[int]:
+        """Index of the "{" opening the body for the parameter list at ``open_paren``."""
+        after = pairs.get(open_paren, len(tokens)) + 1
+        if arrow:
+            if _value(tokens, after) != "=>":
+                return None
+            after += 1
+        return after if _value(tokens, after) == "{" and after in pairs else None
+
+    for index, token in enumerate(tokens):
+        if token.kind != "name":
+            continue
+        following, start = _value(tokens, index + 1), None
+        if following == "(" and token.value not in NOT_FUNCTION_NAMES:
+            # function name(...) {   and methods   name(...) {
+            start = body_after(index + 1, arrow=False)
+        elif following in ("=", ":"):
+            value = index + 2
+            if _value(tokens, value) == "async":
+                value += 1
+            if _value(tokens, value) == "function":
+                # name = function (...) {   name: function other(...) {
+                value += 1
+                if value < len(tokens) and tokens[value].kind == "name":
+                    value += 1
+                if _value(tokens, value) == "(":
+                    start = body_after(value, arrow=False)
+            elif _value(tokens, value) == "(":
+                # name = (...) => {
+                start = body_after(value, arrow=True)
+            elif value < len(tokens) and tokens[value].kind == "name" and _value(tokens, value + 1) == "=>" \
+                    and _value(tokens, value + 2) == "{":
+                # name = x => {
+                start = value + 2
+        if start is not None and start in pairs:
+            bodies.setdefault(token.value, []).append((start, pairs[start]))
+    return bodies
+
+
+def _inline_callback(tokens: List[Token], pairs: Dict[int, int], open_paren: int) -> Optional[Range]:
+    """Body of a function literal passed as the first argument of the call at ``open_paren``."""
+    index = open_paren + 1
+    while index < len(tokens) and tokens[index].value in ("async", "function"):
+        index += 1
+    if index < len(tokens) and tokens[index].kind == "name" and index + 1 < len(tokens) \
+            and tokens[index + 1].value in ("(", "=>"):
+        index += 1
+    if index < len(tokens) and tokens[index].value == "(" and index in pairs:
+        index = pairs[index] + 1
+    if index < len(tokens) and tokens[index].value == "=>":
+        index += 1
+    if index < len(tokens) and tokens[index].value == "{" and index in pairs:
+        return index, pairs[index]
+    return None
+
+
+def _frame_ranges(tokens: List[Token], pairs: Dict[int, int],
+                  bodies: Dict[str, List[Range]]) -> Dict[Range, str]:
+    """Every body that runs once per frame, with the name it is reported under."""
+    frames: Dict[Range, str] = {}
+    pending: List[Tuple[Range, str]] = []
+    for name, ranges in bodies.items():
+        if name.lower() in GAME_LOOP_NAMES:
+            pending += [(body, name) for body in ranges]
+    for index, token in enumerate(tokens[:-1]):
+        if token.value in FRAME_SCHEDULERS and tokens[index + 1].value == "(" and index + 1 in pairs:
+            inline = _inline_callback(tokens, pairs, index + 1)
+            if inline is not None:
+                pending.append((inline, f"{token.value} callback"))
+                continue
+            for argument in tokens[index + 2:pairs[index + 1]]:
+                if argument.kind == "name" and argument.value in bodies:
+                    pending += [(body, argument.value) for body in bodies[argument.value]]
+    # Anything called by name from a frame body also runs every frame
+    while pending:
+        body, name = pending.pop()
+        if body in frames:
+            continue
+        frames[body] = name
+        start, end = body
+        for index in range(start + 1, end):
+            token = tokens[index]
+            if token.kind == "name" and token.value in bodies and tokens[index + 1].value == "(" \
+                    and tokens[index - 1].value != "function":
+                pending += [(callee, token.value) for callee in bodies[token.value]]
+    return frames
+
+
+def _loop_ranges(tokens: List[Token], pairs: Dict[int, int]) -> List[Range]:
+    """Bodies of for/while/do loops and of forEach callbacks."""
+    loops: List[Range] = []
+    for index, token in enumerate(tokens[:-1]):
+        if token.value in ("for", "while") and tokens[index + 1].value == "(" and index + 1 in pairs:
+            after = pairs[index + 1] + 1
+            if after < len(tokens) and tokens[after].value == "{" and after in pairs:
+                loops.append((after, pairs[after]))
+            elif after < len(tokens):  # single statement
+                end = after
+                while end < len(tokens) and tokens[end].value != ";" and not tokens[end].newline_before:
+                    end += 1
+                loops.append((after - 1, end))
+        elif token.value == "do" and tokens[index + 1].value == "{" and index + 1 in pairs:
+            loops.append((index + 1, pairs[index + 1]))
+        elif token.value == "forEach" and tokens[index + 1].value == "(" and index + 1 in pairs:
+            loops.append((index + 1, pairs[index + 1]))
+    return loops
+
+
+def _innermost(ranges: Dict[Range, str], count: int) -> List[Optional[str]]:
+    """For every token index, the name of the smallest range containing it."""
+    labels: List[Optional[str]] = [None] * count
+    for (start, end), name in sorted(ranges.items(), key=lambda item: item[0][0] - item[0][1]):
+        for index in range(start + 1, min(end, count)):
+            labels[index] = name
+    return labels
+
+
+def _receiver(tokens: List[Token], dot: int) -> str:
+    """The dotted name before ``tokens[dot]`` ("this.enemies" for "this.enemies.push")."""
+    parts: List[str] = []
+    index = dot - 1
+    while index >= 0 and tokens[index].kind == "name":
+        parts.insert(0, tokens[index].value)
+        if index >= 1 and tokens[index - 1].value in (".", "?."):
+            index -= 2
+        else:
+            break
+    return ".".join(parts)
+
+
+# ---------------------------------------------------------------------------
+#  Rules
+# ---------------------------------------------------------------------------
+def _function_start(tokens: List[Token], pairs: Dict[int, int], index: int) -> int:
+    """Index of the first token of the function literal whose "function"/"=>" is at ``index``."""
+    if tokens[index].value == "=>":
+        previous = index - 1
+        start = pairs.get(previous, previous) if _value(tokens, previous) == ")" else previous
+    else:
+        start = index
+    return start - 1 if _value(tokens, start - 1) == "async" else start
+
+
+def _array_key(receiver: str) -> str:
+    """Arrays are matched by their last name, so ``this.enemies`` and ``game.enemies`` agree."""
+    return receiver.rsplit(".", 1)[-1]
+
+
+def analyze_source(filename: str, source: str) -> List[Dict[str, Any]]:
+    """
+    Findings for one JavaScript file as ``{"rule", "line", "function", "detail"}``
+    dicts. Module level so it can run in a process pool.
+    """
+    tokens = tokenize(source)
+    if not tokens:
+        return []
+    pairs = match_brackets(tokens)
+    bodies = _function_bodies(tokens, pairs)
+    frames = _frame_ranges(tokens, pairs, bodies)
+    frame_of = _innermost(frames, len(tokens))
+    loop_of = _innermost({body: "loop" for body in _loop_ranges(tokens, pairs)}, len(tokens))
+    function_of = _innermost({body: name for name, ranges in bodies.items() for body in ranges}, len(tokens))
+    constructors = bodies.get("constructor", [])
+    findings: List[Dict[str, Any]] = []
+    growing: Dict[str, Tuple[int, str, str]] = {}  # array key -> (token, function, receiver) of its first per-frame push
+    trimmed: Set[str] = set()
+
+    def add(rule: str, index: int, detail: str) -> None:
+        findings.append({"rule": rule, "line": tokens[index].line,
+                         "function": frame_of[index] or function_of[index] or "", "detail": detail})
+
+    for index, token in enumerate(tokens):
+        frame = frame_of[index]
+        previous, following = _value(tokens, index - 1), _value(tokens, index + 1)
+
+        # Array growth and trimming, anywhere in the file
+        if token.value in (".", "?.") and following:
+            receiver = _receiver(tokens, index)
+            if receiver and following in ("push", "unshift") and frame:
+                growing.setdefault(_array_key(receiver), (index, frame, receiver))
+            elif receiver and (following in REMOVING_METHODS
+                               or (following == "length" and _value(tokens, index + 2) == "=")):
+                trimmed.add(_array_key(receiver))
+        elif token.value == "=" and index and tokens[index - 1].kind == "name":
+            declaration = _value(tokens, index - 2) in ("let", "const", "var")
+            in_constructor = any(start < index < end for start, end in constructors)
+            if not declaration and not in_constructor:
+                trimmed.add(_array_key(_receiver(tokens, index)))  # reassigned, e.g. to a filtered copy
+
+        # DOM lookups and layout reads, in any loop or frame
+        if (frame or loop_of[index]) and token.kind == "name" and token.value in DOM_QUERIES and following == "(":
+            add("dom-query-in-loop", index, f"{token.value}()")
+        if frame is None:
+            continue
+
+        # Assets created or loaded every frame
+        if token.value == "new" and following in ASSET_CONSTRUCTORS:
+            add("asset-load-in-loop", index, f"new {following}()")
+        elif token.kind == "name" and token.value in ASSET_CALLS and following == "(" and previous != "function":
+            add("asset-load-in-loop", index, f"{token.value}()")
+        elif token.value == "src" and previous == "." and following == "=":
+            add("asset-load-in-loop", index, ".src assignment")
+
+        # Allocations every frame
+        elif token.value == "new" and previous != "throw" and index + 1 < len(tokens) \
+                and tokens[index + 1].kind == "name":
+            add("frame-allocation", index, f"new {following}()")
+        elif token.value in ("[", "{") and previous in LITERAL_PRECEDERS \
+                and not (token.value == "{" and previous == ":"):
+            add("frame-allocation", index, "array literal" if token.value == "[" else "object literal")
+        elif token.value == "..." and previous in ("[", "{", ","):
+            add("frame-allocation", index, "spread copy")
+        elif token.value in (".", "?.") and following in ALLOCATING_METHODS and _value(tokens, index + 2) == "(":
+            add("frame-allocation", index, f".{following}()")
+        elif token.value == "." and (previous, following) in ALLOCATING_CALLS:
+            add("frame-allocation", index, f"{previous}.{following}()")
+        elif token.value in ("function", "=>"):
+            # Callbacks passed straight to a call are left alone; stored closures are flagged
+            start = _function_start(tokens, pairs, index)
+            if _value(tokens, start - 1) not in ("(", ","):
+                add("frame-allocation", index, "closure")
+
+    for key, (index, frame, receiver) in growing.items():
+        if key not in trimmed:
+            findings.append({"rule": "unbounded-array", "line": tokens[index].line,
+                             "function": frame, "detail": receiver})
+    return sorted(findings, key=lambda finding: (finding["line"], finding["rule"]))
+
+
+# ---------------------------------------------------------------------------
+#  Feedback
+# ---------------------------------------------------------------------------
+def _lines(findings: List[Dict[str, Any]]) -> str:
+    lines = sorted({finding["line"] for finding in findings})
+    shown = ", ".join(str(line) for line in lines[:MAX_LINES_SHOWN])
+    return shown + (f" and {len(lines) - MAX_LINES_SHOWN} more" if len(lines) > MAX_LINES_SHOWN else "")
+
+
+def to_feedback(filename: str, findings: List[Dict[str, Any]], timestamp: str) -> QAFeedback:
+    if not findings:
+        return QAFeedback(filename=filename, reviewer=REVIEWER, reviewer_type="Technical QA", status="passed",
+                          comments="No performance antipatterns found.", review_timestamp=timestamp)
+    comments, suggestions = [], []
+    for rule, (problem, suggestion) in RULES.items():
+        matched = [finding for finding in findings if finding["rule"] == rule]
+        if not matched:
+            continue
+        functions = sorted({finding["function"] for finding in matched if finding["function"]})
+        details = sorted({finding["detail"] for finding in matched})
+        lines = _lines(matched)
+        comments.append(f"{rule}: {problem} in {', '.join(functions) or 'top-level code'} "
+                        f"({'lines' if ',' in lines or ' ' in lines else 'line'} {lines}: "
+                        f"{', '.join(details[:MAX_LINES_SHOWN])}).")
+        suggestions.append(suggestion)
+    return QAFeedback(filename=filename, reviewer=REVIEWER, reviewer_type="Technical QA",
+                      status="correction_needed", comments=" ".join(comments), suggestions=suggestions,
+                      review_timestamp=timestamp)
+
+
+def analyze_performance(code_files: Dict[str, str], workers: Optional[int] = None) -> List[QAFeedback]:
+    """One ``QAFeedback`` per ``.js`` file in ``code_files`` ({filename: source})."""
+    scripts = {name: source for name, source in code_files.items() if name.lower().endswith((".js", ".mjs"))}
+    if not scripts:
+        return []
+    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    names = sorted(scripts)
+    # spawn: the flow is threaded, and a forked child can deadlock on locks held at fork time
+    with ProcessPoolExecutor(max_workers=max(1, min(workers or PERF_ANALYZER_WORKERS, len(names))),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = pool.map(analyze_source, names, [scripts[name] for name in names])
+        return [to_feedback(name, findings, timestamp) for name, findings in zip(names, results)]
+
+
+def format_feedback(feedback: List[QAFeedback], max_files: Optional[int] = None) -> str:
+    """
+    Plain-text digest of the files that need attention, for the QA crew's
+    prompt; with ``max_files``, only that many flagged files are listed.
+    """
+    flagged = [item for item in feedback if item.status != "passed"]
+    if not feedback:
+        return "No JavaScript files were analysed."
+    lines = [f"Static analysis checked {len(feedback)} JavaScript files; "
+             f"{len(flagged)} flagged for performance fixes."]
+    for item in flagged[:max_files]:
+        lines.append(f"- {item.filename}: {item.comments}")
+    if max_files is not None and len(flagged) > max_files:
+        lines.append(f"- ... and {len(flagged) - max_files} more flagged files")
+    return "\n".join(lines)
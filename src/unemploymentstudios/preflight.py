@@ -0,0 +1,215 @@
+"""
+Preflight checks run at the start of every GameFlow.
+
+All checks run concurrently and only use free metadata calls:
+
+    openai_model:<id>   GET /models/<id> for every model the crews use
+    freesound           a one-result text search (validates the token)
+    writable:<dir>      create and remove a temp file in each output directory
+    disk_space          free space at least PREFLIGHT_MIN_FREE_MB
+
+Successful API checks are remembered in PREFLIGHT_CACHE for
+PREFLIGHT_CACHE_HOURS, keyed by a hash of the key and endpoint (never the key
+itself), so back-to-back runs skip the network entirely. Failures are
+printed; with PREFLIGHT_STRICT=1 they abort the run.
+
+The paid end-to-end smoke tests (a real DALL·E image and a real Freesound
+download) live in ``run_smoke_tests`` and only run from the ``diagnose``
+command.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from unemploymentstudios.checkpoint import RUNS_ROOT, atomic_write_text
+from unemploymentstudios.metrics import metrics
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+FREESOUND_API_BASE = "https://freesound.org/apiv2"
+REQUIRED_MODELS = ["gpt-4o", "dall-e-3"]
+OUTPUT_DIRS = ["./Game", "./assets", "./public/assets", str(RUNS_ROOT)]
+CHECK_TIMEOUT_SECONDS = 10.0
+
+
+class PreflightError(RuntimeError):
+    """Raised in strict mode when a preflight check fails."""
+
+
+def _openai_base() -> str:
+    return (os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE") or OPENAI_API_BASE).rstrip("/")
+
+
+def _freesound_base() -> str:
+    return os.getenv("FREESOUND_API_BASE", FREESOUND_API_BASE).rstrip("/")
+
+
+# ---------------------------------------------------------------------------
+#  Result cache
+# ---------------------------------------------------------------------------
+class PreflightCache:
+    """Remembers which API checks passed, and when."""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        try:
+            self.entries: Dict[str, float] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @classmethod
+    def from_env(cls) -> "PreflightCache":
+        return cls(
+            os.getenv("PREFLIGHT_CACHE", "./.preflight_cache.json"),
+            float(os.getenv("PREFLIGHT_CACHE_HOURS", "6")) * 3600,
+        )
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def fresh(self, key: str) -> bool:
+        return time.time() - self.entries.get(key, 0) < self.ttl_seconds
+
+    def mark(self, key: str) -> None:
+        self.entries[key] = time.time()
+
+    def save(self) -> None:
+        now = time.time()
+        live = {key: at for key, at in self.entries.items() if now - at < self.ttl_seconds}
+        atomic_write_text(self.path, json.dumps(live, indent=2))
+
+
+# ---------------------------------------------------------------------------
+#  Checks
+# ---------------------------------------------------------------------------
+async def _check_openai_model(http, model: str, cache: PreflightCache, use_cache: bool) -> Dict[str, Any]:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return {"ok": False, "detail": "OPENAI_API_KEY is not set"}
+    key = cache.make_key("openai", _openai_base(), model, hashlib.sha256(api_key.encode()).hexdigest())
+    if use_cache and cache.fresh(key):
+        return {"ok": True, "detail": "available", "cached": True}
+    response = await http.get(f"{_openai_base()}/models/{model}", headers={"Authorization": f"Bearer {api_key}"})
+    if response.status_code == 200:
+        cache.mark(key)
+        return {"ok": True, "detail": "available"}
+    if response.status_code in (401, 403):
+        return {"ok": False, "detail": f"API key rejected (HTTP {response.status_code})"}
+    return {"ok": False, "detail": f"model not available (HTTP {response.status_code})"}
+
+
+async def _check_freesound(http, cache: PreflightCache, use_cache: bool) -> Dict[str, Any]:
+    api_key = os.getenv("FREESOUND_API_KEY")
+    if not api_key:
+        return {"ok": False, "detail": "FREESOUND_API_KEY is not set; sounds will be skipped"}
+    key = cache.make_key("freesound", _freesound_base(), hashlib.sha256(api_key.encode()).hexdigest())
+    if use_cache and cache.fresh(key):
+        return {"ok": True, "detail": "token accepted", "cached": True}
+    response = await http.get(
+        f"{_freesound_base()}/search/text/",
+        params={"query": "click", "fields": "id", "page_size": 1},
+        headers={"Authorization": f"Token {api_key}"},
+    )
+    if response.status_code == 200:
+        cache.mark(key)
+        return {"ok": True, "detail": "token accepted"}
+    return {"ok": False, "detail": f"token rejected (HTTP {response.status_code})"}
+
+
+def _check_writable(directory: str) -> Dict[str, Any]:
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, prefix=".preflight-"):
+            pass
+    except OSError as e:
+        return {"ok": False, "detail": f"not writable: {e}"}
+    return {"ok": True, "detail": "writable"}
+
+
+def _check_disk_space() -> Dict[str, Any]:
+    min_free = float(os.getenv("PREFLIGHT_MIN_FREE_MB", "500")) * 1024 * 1024
+    free = shutil.disk_usage(".").free
+    detail = f"{free / 1024 / 1024:.0f} MB free"
+    return {"ok": free >= min_free, "detail": detail if free >= min_free else detail + " (too little)"}
+
+
+async def _timed(name: str, coro) -> Dict[str, Any]:
+    with metrics.span("preflight", name) as span:
+        try:
+            result = await asyncio.wait_for(coro, CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            result = {"ok": False, "detail": f"{type(e).__name__}: {e}"}
+        span["status"] = "ok" if result["ok"] else "failed"
+    return {"name": name, "cached": False, **result, "seconds": span["wall_seconds"]}
+
+
+async def run_preflight(use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Run every check concurrently and print a short report."""
+    cache = PreflightCache.from_env()
+    async with httpx.AsyncClient(timeout=CHECK_TIMEOUT_SECONDS) as http:
+        checks = [
+            *[_timed(f"openai_model:{model}", _check_openai_model(http, model, cache, use_cache))
+              for model in REQUIRED_MODELS],
+            _timed("freesound", _check_freesound(http, cache, use_cache)),
+            *[_timed(f"writable:{directory}", asyncio.to_thread(_check_writable, directory))
+              for directory in OUTPUT_DIRS],
+            _timed("disk_space", asyncio.to_thread(_check_disk_space)),
+        ]
+        results = list(await asyncio.gather(*checks))
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"Warning: could not save preflight cache: {e}")
+
+    print("=== Preflight ===")
+    for result in results:
+        status = "OK  " if result["ok"] else "FAIL"
+        source = " (cached)" if result.get("cached") else ""
+        print(f"  [{status}] {result['name']}: {result['detail']}{source}")
+
+    failed = [result["name"] for result in results if not result["ok"]]
+    if failed and os.getenv("PREFLIGHT_STRICT", "").lower() in ("1", "true", "yes"):
+        raise PreflightError(f"Preflight failed: {', '.join(failed)}")
+    return results
+
+
+# ---------------------------------------------------------------------------
+#  Paid smoke tests (diagnose command only)
+# ---------------------------------------------------------------------------
+# File name stem of the smoke-test outputs; older versions wrote them to ./assets
+SMOKE_TEST_STEM = "test_direct"
+
+
+def run_smoke_tests(output_dir: str = "./diagnostics") -> Dict[str, Any]:
+    """
+    Generate one real image and download one real sound with the asset
+    tools. This costs money; it is only run on request.
+    """
+    from unemploymentstudios.crews.asset_generation_crew.asset_generation_crew import (
+        GenerateAndDownloadImageTool,
+        SearchAndSaveSoundTool,
+    )
+
+    print("Testing image generation tool directly...")
+    image_result = GenerateAndDownloadImageTool()._run(
+        prompt="Test image for game - a simple game logo",
+        file_name=os.path.join(output_dir, f"{SMOKE_TEST_STEM}.png"),
+    )
+    print(f"Direct image tool test result: {image_result}")
+
+    print("Testing audio tool directly...")
+    audio_result = SearchAndSaveSoundTool()._run(
+        query="game background music",
+        output_path=os.path.join(output_dir, f"{SMOKE_TEST_STEM}.mp3"),
+    )
+    print(f"Direct audio tool test result: {audio_result}")
+    return {"image": image_result, "audio": audio_result}
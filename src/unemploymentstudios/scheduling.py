@@ -0,0 +1,332 @@
+"""
+Bounded-concurrency scheduling for blocking crew kickoffs.
+
+``Crew.kickoff`` is synchronous, so calling it from an ``async`` flow method
+blocks the event loop and every "concurrent" job ends up running one after
+another. ``BoundedRunner`` pushes each job onto a worker thread, caps how many
+are in flight at once, applies a per-job timeout and records how much
+parallelism was actually achieved.
+
+``build_dependency_graph`` and ``run_dag`` layer dependency ordering on top:
+each file starts as soon as the files it depends on have finished, and is
+handed their outputs.
+
+``CrewProcessPool`` runs the kickoffs themselves in spawned worker processes.
+crewAI swaps process-global state on every LLM call (litellm's callback
+lists, ``sys.stdout``) and its console printer is not thread-safe, so two
+crews must never run in the same process at the same time.
+"""
+import asyncio
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from unemploymentstudios.types import FileStructureSpec
+
+
+class DependencyCycleError(ValueError):
+    """Raised when the planned files depend on each other in a loop."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__("Dependency cycle: " + " -> ".join(cycle))
+
+
+class BoundedRunner:
+    """Run blocking callables on a thread pool with at most ``max_concurrency`` in flight."""
+
+    def __init__(self, max_concurrency: int = 4, timeout: Optional[float] = None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="crew-job"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._busy_seconds = 0.0
+        self._started_at: Optional[float] = None
+        self._counts = {"completed": 0, "failed": 0, "timed_out": 0}
+        self.jobs: List[Dict[str, Any]] = []
+
+    async def run(self, name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run ``fn(*args)`` on a worker thread and return its result.
+
+        Raises ``asyncio.TimeoutError`` if the job exceeds the timeout. A worker
+        thread cannot be interrupted, so a timed-out job keeps its slot until
+        the underlying call actually returns; the caller just stops waiting.
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+
+        record: Dict[str, Any] = {"name": name, "queued_at": time.perf_counter()}
+        self.jobs.append(record)
+
+        await self._semaphore.acquire()
+        record["started_at"] = time.perf_counter()
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+        future = loop.run_in_executor(self._executor, fn, *args)
+        future.add_done_callback(lambda _: self._release(record))
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            record["status"] = "timed_out"
+            self._counts["timed_out"] += 1
+            raise
+        except Exception:
+            record["status"] = "failed"
+            self._counts["failed"] += 1
+            raise
+        record["status"] = "completed"
+        self._counts["completed"] += 1
+        return result
+
+    def _release(self, record: Dict[str, Any]) -> None:
+        record["finished_at"] = time.perf_counter()
+        self._busy_seconds += record["finished_at"] - record["started_at"]
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def summary(self) -> Dict[str, float]:
+        """Return job counts, wall/busy time and the parallelism achieved so far."""
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        queued = [
+            job["started_at"] - job["queued_at"] for job in self.jobs if "started_at" in job
+        ]
+        return {
+            "jobs": len(self.jobs),
+            "completed": self._counts["completed"],
+            "failed": self._counts["failed"],
+            "timed_out": self._counts["timed_out"],
+            "max_concurrency": self.max_concurrency,
+            "peak_in_flight": self._peak_in_flight,
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(self._busy_seconds, 3),
+            "avg_parallelism": round(self._busy_seconds / wall, 2) if wall else 0.0,
+            "avg_queue_seconds": round(sum(queued) / len(queued), 3) if queued else 0.0,
+        }
+
+    def close(self) -> None:
+        """Stop accepting work; threads of timed-out jobs are left to finish on their own."""
+        self._executor.shutdown(wait=False)
+
+
+# ---------------------------------------------------------------------------
+#  Crew kickoffs in worker processes
+# ---------------------------------------------------------------------------
+def _kickoff_in_process(
+    crew_path: str, name: str, inputs: Dict[str, Any]
+) -> Tuple[str, List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Worker entry point: kick off the crew class at ``crew_path``
+    ("module:Class") and return its raw output together with the metrics
+    spans and LLM cache counts recorded while it ran.
+    """
+    from unemploymentstudios.llm_cache import llm_cache
+    from unemploymentstudios.metrics import metrics
+
+    module_name, class_name = crew_path.split(":")
+    crew_class = getattr(importlib.import_module(module_name), class_name)
+    metrics.reset()
+    llm_cache.take_counts()
+    output = metrics.kickoff_crew(name, crew_class().crew(), inputs)
+    return output.raw, list(metrics.spans), llm_cache.take_counts()
+
+
+class CrewProcessPool:
+    """Run crew kickoffs in spawned worker processes, one crew per process at a time."""
+
+    def __init__(self, max_workers: int = 4):
+        # spawn: the flow's threads and event loop do not survive fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=max(1, int(max_workers)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def kickoff(self, crew_path: str, name: str, inputs: Dict[str, Any]) -> str:
+        """
+        Blocking: run ``crew_path`` with ``inputs`` in a worker and return the
+        raw crew output. The worker's spans and cache counts are merged into
+        this process's ``metrics`` and ``llm_cache``; exceptions raised by the
+        crew are re-raised here.
+        """
+        from unemploymentstudios.llm_cache import llm_cache
+        from unemploymentstudios.metrics import metrics
+
+        raw, spans, cache_counts = self._executor.submit(_kickoff_in_process, crew_path, name, inputs).result()
+        metrics.extend(spans)
+        llm_cache.add_counts(cache_counts)
+        return raw
+
+    def close(self) -> None:
+        """Drop queued kickoffs; running ones are left to finish on their own."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_summary(summary: Dict[str, float]) -> str:
+    """One-line, human readable rendering of ``BoundedRunner.summary()``."""
+    return (
+        f"{summary['completed']}/{summary['jobs']} completed, "
+        f"{summary['failed']} failed, {summary['timed_out']} timed out | "
+        f"wall {summary['wall_seconds']:.1f}s, busy {summary['busy_seconds']:.1f}s, "
+        f"avg parallelism {summary['avg_parallelism']:.2f} "
+        f"(peak {summary['peak_in_flight']}/{summary['max_concurrency']})"
+    )
+
+
+# ---------------------------------------------------------------------------
+#  Dependency-aware scheduling
+# ---------------------------------------------------------------------------
+def normalise_filename(filename: str) -> str:
+    """Canonical form used to match dependency names against planned files."""
+    name = filename.strip().replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+def build_dependency_graph(spec: FileStructureSpec) -> Dict[str, List[str]]:
+    """
+    Map every planned filename to the planned files it depends on.
+
+    Dependencies are matched by normalised path first, then by basename when
+    that is unambiguous (plans often say ``player.js`` for ``js/player.js``).
+    Anything that is not a planned file (CDN libraries, browser APIs, ...) is
+    dropped, as are self-references.
+    """
+    by_path: Dict[str, str] = {}
+    by_basename: Dict[str, List[str]] = {}
+    for file_spec in spec.files:
+        by_path[normalise_filename(file_spec.filename)] = file_spec.filename
+        by_basename.setdefault(
+            os.path.basename(normalise_filename(file_spec.filename)), []
+        ).append(file_spec.filename)
+
+    graph: Dict[str, List[str]] = {}
+    for file_spec in spec.files:
+        deps: List[str] = []
+        for dep in file_spec.dependencies or []:
+            key = normalise_filename(dep)
+            target = by_path.get(key)
+            if target is None and len(by_basename.get(os.path.basename(key), [])) == 1:
+                target = by_basename[os.path.basename(key)][0]
+            if target and target != file_spec.filename and target not in deps:
+                deps.append(target)
+        graph[file_spec.filename] = deps
+    return graph
+
+
+def find_cycle(graph: Dict[str, List[str]]) -> Optional[List[str]]:
+    """Return one dependency cycle as a closed path, or None if the graph is acyclic."""
+    visiting, done = set(), set()
+    for root in graph:
+        if root in done:
+            continue
+        path: List[str] = []
+        stack = [(root, iter(graph.get(root, [])))]
+        visiting.add(root)
+        path.append(root)
+        while stack:
+            node, deps = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                stack.pop()
+                path.pop()
+                visiting.discard(node)
+                done.add(node)
+            elif dep in visiting:
+                return path[path.index(dep):] + [dep]
+            elif dep not in done:
+                visiting.add(dep)
+                path.append(dep)
+                stack.append((dep, iter(graph.get(dep, []))))
+    return None
+
+
+def break_cycles(graph: Dict[str, List[str]]) -> Tuple[Dict[str, List[str]], List[Tuple[str, str]]]:
+    """
+    Return a copy of ``graph`` without dependency cycles, and the
+    ``(dependent, dependency)`` edges removed to get there. Only the edge
+    that closes each cycle found is dropped, so the rest of the ordering
+    (and the dependency outputs it passes along) is kept.
+    """
+    graph = {node: list(deps) for node, deps in graph.items()}
+    dropped: List[Tuple[str, str]] = []
+    cycle = find_cycle(graph)
+    while cycle:
+        dependent, dependency = cycle[-2], cycle[-1]
+        graph[dependent].remove(dependency)
+        dropped.append((dependent, dependency))
+        cycle = find_cycle(graph)
+    return graph, dropped
+
+
+def topological_order(graph: Dict[str, List[str]]) -> List[str]:
+    """Order nodes so every file comes after its dependencies."""
+    cycle = find_cycle(graph)
+    if cycle:
+        raise DependencyCycleError(cycle)
+    pending = {node: len(deps) for node, deps in graph.items()}
+    dependents: Dict[str, List[str]] = {node: [] for node in graph}
+    for node, deps in graph.items():
+        for dep in deps:
+            dependents.setdefault(dep, []).append(node)
+    ready = [node for node, count in pending.items() if count == 0]
+    order: List[str] = []
+    while ready:
+        node = ready.pop(0)
+        order.append(node)
+        for dependent in dependents.get(node, []):
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+    return order
+
+
+async def run_dag(
+    graph: Dict[str, List[str]],
+    job: Callable[[str, Dict[str, Any]], Any],
+    runner: BoundedRunner,
+) -> Dict[str, Any]:
+    """
+    Run ``job(name, dependency_results)`` for every node of ``graph`` on ``runner``.
+
+    A node starts as soon as all of its dependencies have settled and receives
+    the results of those that succeeded. Failed or timed-out nodes are absent
+    from the returned mapping, and their dependents still run without them.
+    Raises ``DependencyCycleError`` before starting anything if the graph has
+    a cycle.
+    """
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_node(name: str) -> Any:
+        dep_results: Dict[str, Any] = {}
+        for dep in graph.get(name, []):
+            try:
+                dep_results[dep] = await tasks[dep]
+            except Exception:
+                pass
+        return await runner.run(name, job, name, dep_results)
+
+    for name in topological_order(graph):
+        tasks[name] = asyncio.create_task(run_node(name))
+
+    results: Dict[str, Any] = {}
+    for name, task in tasks.items():
+        try:
+            results[name] = await task
+        except asyncio.TimeoutError:
+            print(f"Timed out running {name} after {runner.timeout}s")
+        except Exception as e:
+            print(f"Error running {name}: {e}")
+    return results
@@ -0,0 +1,306 @@
+"""
+Preview server for a generated game.
+
+``python -m http.server`` sends every file uncompressed, with no validators
+and no range support, so a playtest over it loads nothing like a real
+deployment would. ``serve_game`` runs an asyncio HTTP/1.1 server over the
+build in ./Game/dist (or ./Game when there is no build yet) that:
+
+    - sends the precompressed ``.br``/``.gz`` variant written by the build when
+      the client accepts it (``Vary: Accept-Encoding``)
+    - tags every representation with a strong ETag (SHA-256 of its bytes) and
+      answers ``If-None-Match`` with 304
+    - marks content-hashed files (``name.<hash>.ext``) as immutable for a year
+      and everything else ``no-cache``, so pages always revalidate
+    - serves single ``Range: bytes=`` requests with 206, as audio and video
+      elements need for seeking (``If-Range`` is honoured)
+    - keeps connections alive and handles each client in its own task
+
+Only GET and HEAD are supported.
+
+Settings (environment):
+    SERVE_HOST              interface to bind (default 127.0.0.1)
+    SERVE_PORT              port (default 8000)
+    SERVE_CHUNK_KB          read/write size for response bodies (default 256)
+    SERVE_KEEPALIVE_SECONDS idle time before a kept-alive connection is closed (default 15)
+"""
+import asyncio
+import email.utils
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
+
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+CHUNK_SIZE = int(os.getenv("SERVE_CHUNK_KB", "256")) * 1024
+KEEPALIVE_SECONDS = float(os.getenv("SERVE_KEEPALIVE_SECONDS", "15"))
+MAX_HEADERS = 100
+
+# Content-hashed names written by the build, e.g. bundle.27f6a2608e.js
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,64}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+TEXT_TYPES = {"application/javascript", "application/json", "image/svg+xml", "application/xml"}
+
+MIME_TYPES = {
+    ".js": "text/javascript",
+    ".mjs": "text/javascript",
+    ".json": "application/json",
+    ".wasm": "application/wasm",
+    ".webp": "image/webp",
+    ".ogg": "audio/ogg",
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+}
+
+REASONS = {200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed", 416: "Range Not Satisfiable"}
+
+
+def default_root() -> Path:
+    """./Game/dist when the production build exists, else ./Game."""
+    dist = Path("./Game/dist")
+    return dist if (dist / "index.html").exists() else Path("./Game")
+
+
+def content_type(path: Path) -> str:
+    mime = MIME_TYPES.get(path.suffix.lower()) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if mime.startswith("text/") or mime in TEXT_TYPES:
+        mime += "; charset=utf-8"
+    return mime
+
+
+def cache_control(path: Path) -> str:
+    return IMMUTABLE if HASHED_NAME.search(path.name) else REVALIDATE
+
+
+def accepted_encodings(header: str) -> List[str]:
+    """Codings from an Accept-Encoding header with a non-zero q-value."""
+    accepted = []
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = re.search(r"q\s*=\s*([0-9]*\.?[0-9]+)", params)
+        if coding and not (q and float(q.group(1)) == 0):
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive ``(first, last)`` byte positions of a single ``bytes=`` range.
+    Returns None for headers this server ignores (other units, multiple
+    ranges) and raises ValueError for unsatisfiable ones.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first.isdigit() or last.isdigit()) or (first and not first.isdigit()) \
+            or (last and not last.isdigit()):
+        return None
+    if not first:  # suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - int(last)), size - 1
+    start, end = int(first), int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range outside the file")
+    return start, min(end, size - 1)
+
+
+class StaticFiles:
+    """Path resolution and cached strong ETags for one directory tree."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root).resolve()
+        self._etags: Dict[Tuple[str, int, int], str] = {}
+
+    def resolve(self, target: str) -> Optional[Path]:
+        """The file a request target refers to, or None if it is missing or outside the root."""
+        parts = [part for part in unquote(urlsplit(target).path).split("/") if part]
+        if any(part.startswith(".") or "\\" in part or "\0" in part for part in parts):
+            return None
+        path = self.root.joinpath(*parts)
+        if path.is_dir():
+            path = path / "index.html"
+        try:
+            path = path.resolve(strict=True)
+            path.relative_to(self.root)
+        except (OSError, ValueError):
+            return None
+        return path if path.is_file() else None
+
+    def etag(self, path: Path, stat: os.stat_result) -> str:
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._etags:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            self._etags[key] = f'"{digest.hexdigest()[:32]}"'
+        return self._etags[key]
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison."""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class PreviewServer:
+    def __init__(self, root: Union[str, Path], quiet: bool = False):
+        self.files = StaticFiles(root)
+        self.quiet = quiet
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        client = peer[0] if isinstance(peer, tuple) else "-"
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = "keep-alive" in connection if version == "HTTP/1.0" else "close" not in connection
+                await self._respond(writer, client, method, target, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await asyncio.wait_for(reader.readline(), KEEPALIVE_SECONDS)
+        if not line.strip():
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise ValueError("malformed request line")
+        headers: Dict[str, str] = {}
+        for _ in range(MAX_HEADERS):
+            header = await asyncio.wait_for(reader.readline(), KEEPALIVE_SECONDS)
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise ValueError("too many headers")
+        # GET/HEAD bodies have no meaning; drain them to keep the connection in sync
+        length = int(headers.get("content-length", "0") or 0)
+        if length:
+            await reader.readexactly(length)
+        return parts[0], parts[1], parts[2], headers
+
+    async def _respond(self, writer: asyncio.StreamWriter, client: str, method: str, target: str,
+                       headers: Dict[str, str], keep_alive: bool) -> None:
+        response: Dict[str, str] = {
+            "Date": email.utils.formatdate(usegmt=True),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        if method not in ("GET", "HEAD"):
+            response["Allow"] = "GET, HEAD"
+            return await self._send(writer, client, method, target, 405, response, b"Method Not Allowed\n")
+        path = self.files.resolve(target)
+        if path is None:
+            return await self._send(writer, client, method, target, 404, response, b"Not Found\n")
+
+        # Pick the representation: a precompressed variant unless a byte range is wanted
+        body_path, encoding = path, None
+        variants = [(coding, path.with_name(path.name + suffix)) for coding, suffix in ENCODINGS]
+        available = [(coding, variant) for coding, variant in variants if variant.is_file()]
+        if available:
+            response["Vary"] = "Accept-Encoding"
+            if "range" not in headers:
+                accepted = accepted_encodings(headers.get("accept-encoding", ""))
+                for coding, variant in available:
+                    if coding in accepted:
+                        body_path, encoding = variant, coding
+                        break
+
+        stat = body_path.stat()
+        etag = await asyncio.to_thread(self.files.etag, body_path, stat)
+        response.update({
+            "Content-Type": content_type(path),
+            "ETag": etag,
+            "Last-Modified": email.utils.formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": cache_control(path),
+            "Accept-Ranges": "bytes",
+        })
+        if encoding:
+            response["Content-Encoding"] = encoding
+        if "if-none-match" in headers and _etag_matches(headers["if-none-match"], etag):
+            return await self._send(writer, client, method, target, 304, response, b"")
+
+        status, first, last = 200, 0, stat.st_size - 1
+        if "range" in headers and headers.get("if-range", etag) == etag:
+            try:
+                byte_range = parse_range(headers["range"], stat.st_size)
+            except ValueError:
+                response["Content-Range"] = f"bytes */{stat.st_size}"
+                return await self._send(writer, client, method, target, 416, response, b"")
+            if byte_range is not None:
+                status, (first, last) = 206, byte_range
+                response["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+        await self._send(writer, client, method, target, status, response, body_path, first, last - first + 1)
+
+    async def _send(self, writer: asyncio.StreamWriter, client: str, method: str, target: str, status: int,
+                    headers: Dict[str, str], body: Union[bytes, Path], offset: int = 0, length: int = 0) -> None:
+        if isinstance(body, bytes):
+            length = len(body)
+        headers["Content-Length"] = str(0 if status == 304 else length)
+        head = f"HTTP/1.1 {status} {REASONS[status]}\r\n" \
+            + "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1"))
+        if method != "HEAD" and status != 304:
+            if isinstance(body, bytes):
+                writer.write(body)
+            else:
+                with open(body, "rb") as f:
+                    f.seek(offset)
+                    remaining = length
+                    while remaining > 0:
+                        chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        writer.write(chunk)
+                        remaining -= len(chunk)
+                        await writer.drain()
+        await writer.drain()
+        if not self.quiet:
+            encoding = headers.get("Content-Encoding")
+            print(f"{client} {method} {target} {status} {length}" + (f" {encoding}" if encoding else ""))
+
+
+async def run_server(root: Union[str, Path], host: str = SERVE_HOST, port: int = SERVE_PORT,
+                     quiet: bool = False) -> None:
+    server = PreviewServer(root, quiet=quiet)
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving {server.files.root} at http://{host}:{port}/ (Ctrl+C to stop)")
+    async with listener:
+        await listener.serve_forever()
+
+
+def serve_game(root: Optional[Union[str, Path]] = None, host: str = SERVE_HOST, port: int = SERVE_PORT,
+               quiet: bool = False) -> None:
+    """Serve ``root`` (default: the game build) until interrupted."""
+    root = Path(root) if root else default_root()
+    if not root.is_dir():
+        print(f"{root} does not exist; generate a game with `kickoff` first.")
+        return
+    try:
+        asyncio.run(run_server(root, host, port, quiet))
+    except KeyboardInterrupt:
+        print("Stopped.")
@@ -0,0 +1,281 @@
+"""
+Persistent caches for paid or slow asset API calls.
+
+``ImageCache`` keeps every generated image under a SHA-256 of the model,
+size, response format and normalised prompt, so a prompt that was already
+rendered (the crew's fallback images, for one) is linked into place instead
+of being paid for again. ``PreviewCache`` does the same for Freesound
+previews, keyed by preview URL, and ``SearchCache`` remembers Freesound
+search results for a limited time. ``ProcessedCache`` holds the outputs of
+the image and audio post-processing stages under a hash of their input and
+settings. The file caches evict least recently used entries once they grow
+past their byte cap.
+
+Layout::
+
+    .image_cache/<key[:2]>/<key>.blob                   the image bytes
+    .image_cache/<key[:2]>/<key>.json                   provenance (prompt, model, source url, ...)
+    .freesound_cache/previews/<key[:2]>/<key>.blob|json preview bytes + metadata
+    .freesound_cache/search/<key[:2]>/<key>.json        one search response
+    .processed_cache/<key[:2]>/<key>.blob|json          one post-processed output + its settings
+
+Settings (environment):
+    IMAGE_CACHE_DIR             image cache directory (default ./.image_cache)
+    IMAGE_CACHE_MAX_MB          size cap (default 1024)
+    IMAGE_CACHE_MODE            "readwrite" (default) or "off"
+    FREESOUND_CACHE_DIR         search + preview cache directory (default ./.freesound_cache)
+    FREESOUND_CACHE_MAX_MB      preview size cap (default 512)
+    FREESOUND_SEARCH_TTL_HOURS  how long search results stay fresh (default 24)
+    FREESOUND_CACHE_MODE        "readwrite" (default) or "off"
+    PROCESSED_CACHE_DIR         post-processing cache directory (default ./.processed_cache)
+    PROCESSED_CACHE_MAX_MB      size cap (default 1024)
+    PROCESSED_CACHE_MODE        "readwrite" (default) or "off"
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from unemploymentstudios.asset_store import link_or_copy
+from unemploymentstudios.checkpoint import atomic_write_text
+
+
+def normalise_prompt(prompt: str) -> str:
+    """Case and whitespace differences do not change what DALL·E draws."""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def _hash(payload: Dict[str, Any]) -> str:
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class FileCache:
+    """Thread- and process-safe file store with an LRU size cap."""
+
+    def __init__(self, root: Union[str, Path], max_bytes: int, mode: str = "readwrite"):
+        if mode not in ("readwrite", "off"):
+            raise ValueError(f"Cache mode must be 'readwrite' or 'off', got {mode!r}")
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    # ------------------------------------------------------------------
+    # Keys and paths
+    # ------------------------------------------------------------------
+    def blob_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.blob"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a cached entry (bumping its recency), or None."""
+        meta = self._meta_path(key)
+        try:
+            record = json.loads(meta.read_text(encoding="utf-8"))
+            if not self.blob_path(key).exists():
+                raise FileNotFoundError(key)
+            os.utime(meta)  # bump recency for LRU eviction
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return record
+
+    def fetch(self, key: str, dest: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        On a hit, link the cached file to ``dest`` and return its record;
+        otherwise return None.
+        """
+        record = self.lookup(key)
+        if record is None:
+            return None
+        try:
+            link_or_copy(self.blob_path(key), dest)
+        except OSError:  # evicted between lookup and link
+            return None
+        return record
+
+    def store(self, key: str, src: Union[str, Path], record: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the file at ``src`` and its record."""
+        link_or_copy(src, self.blob_path(key))
+        return self.commit(key, record)
+
+    def commit(self, key: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Record an entry whose blob was already written to ``blob_path(key)``."""
+        record = {**record, "key": key, "created": time.time(), "bytes": self.blob_path(key).stat().st_size}
+        atomic_write_text(self._meta_path(key), json.dumps(record, indent=2))
+        with self._lock:
+            self.writes += 1
+            if self._size is not None:
+                self._size += record["bytes"]
+        self._evict_if_needed()
+        return record
+
+    def _entries(self) -> List[Tuple[Path, Path, float, int]]:
+        entries = []
+        for meta in self.root.glob("*/*.json"):
+            blob = meta.with_suffix(".blob")
+            try:
+                entries.append((meta, blob, meta.stat().st_mtime, blob.stat().st_size))
+            except FileNotFoundError:
+                continue  # evicted by another process, or still being written
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for *_, size in self._entries())
+            if self._size <= self.max_bytes:
+                return
+            # Drop least recently used entries until we are 10% under the cap
+            target = int(self.max_bytes * 0.9)
+            for meta, blob, _, size in sorted(self._entries(), key=lambda entry: entry[2]):
+                if self._size <= target:
+                    break
+                meta.unlink(missing_ok=True)
+                blob.unlink(missing_ok=True)
+                self._size -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+
+class ImageCache(FileCache):
+    """Generated images keyed by model, size, response format and prompt."""
+
+    @classmethod
+    def from_env(cls) -> "ImageCache":
+        return cls(
+            root=os.path.abspath(os.getenv("IMAGE_CACHE_DIR", "./.image_cache")),
+            max_bytes=int(float(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024),
+            mode=os.getenv("IMAGE_CACHE_MODE", "readwrite").lower(),
+        )
+
+    @staticmethod
+    def make_key(model: str, size: str, prompt: str, response_format: str) -> str:
+        return _hash({"model": model, "size": size, "prompt": normalise_prompt(prompt),
+                      "response_format": response_format})
+
+
+class PreviewCache(FileCache):
+    """Freesound preview downloads keyed by preview URL."""
+
+    @classmethod
+    def from_env(cls) -> "PreviewCache":
+        root = os.path.abspath(os.getenv("FREESOUND_CACHE_DIR", "./.freesound_cache"))
+        return cls(
+            root=os.path.join(root, "previews"),
+            max_bytes=int(float(os.getenv("FREESOUND_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            mode=os.getenv("FREESOUND_CACHE_MODE", "readwrite").lower(),
+        )
+
+    @staticmethod
+    def make_key(url: str) -> str:
+        return _hash({"url": url})
+
+
+class ProcessedCache(FileCache):
+    """Post-processed assets keyed by their input hashes and processing settings."""
+
+    @classmethod
+    def from_env(cls) -> "ProcessedCache":
+        return cls(
+            root=os.path.abspath(os.getenv("PROCESSED_CACHE_DIR", "./.processed_cache")),
+            max_bytes=int(float(os.getenv("PROCESSED_CACHE_MAX_MB", "1024")) * 1024 * 1024),
+            mode=os.getenv("PROCESSED_CACHE_MODE", "readwrite").lower(),
+        )
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        return _hash(params)
+
+
+class SearchCache:
+    """Search responses that are served for ``ttl_seconds`` after being fetched."""
+
+    def __init__(self, root: Union[str, Path], ttl_seconds: float, mode: str = "readwrite"):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        root = os.path.abspath(os.getenv("FREESOUND_CACHE_DIR", "./.freesound_cache"))
+        return cls(
+            root=os.path.join(root, "search"),
+            ttl_seconds=float(os.getenv("FREESOUND_SEARCH_TTL_HOURS", "24")) * 3600,
+            mode=os.getenv("FREESOUND_CACHE_MODE", "readwrite").lower(),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def make_key(api_base: str, params: Dict[str, Any]) -> str:
+        return _hash({"api_base": api_base, "params": params})
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+            fresh = time.time() - record["created"] < self.ttl_seconds
+        except (OSError, ValueError, KeyError):
+            fresh = False
+        if not fresh:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return record["response"]
+
+    def put(self, key: str, response: Any) -> None:
+        atomic_write_text(self._path(key), json.dumps({"created": time.time(), "response": response}))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
+
+
+# One of each per process, shared by every asset tool call
+image_cache = ImageCache.from_env()
+preview_cache = PreviewCache.from_env()
+search_cache = SearchCache.from_env()
+processed_cache = ProcessedCache.from_env()
@@ -0,0 +1,215 @@
+"""
+Shared, pooled HTTP and API clients for the asset tools.
+
+Building an ``OpenAI`` client, a ``requests`` session or an ``httpx`` client
+per asset means a fresh connection pool, and therefore a fresh TLS
+handshake, for every image and sound. ``clients`` hands out one instance of
+each per process (and one async instance per event loop, since httpx async
+pools are bound to the loop they were created on) with keep-alive enabled.
+
+``get_with_retry`` / ``aget_with_retry`` retry 429 and 5xx responses and
+connection errors with full-jitter exponential backoff, honouring
+``Retry-After``. The OpenAI clients use the SDK's own retry logic, which
+backs off the same way.
+
+    HTTP_MAX_RETRIES       retries per request          (default 4)
+    HTTP_BACKOFF_SECONDS   base backoff delay           (default 0.5)
+    HTTP_POOL_SIZE         connections kept per client  (default 32)
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import dotenv
+import httpx
+import requests
+from openai import AsyncOpenAI, OpenAI
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS = 30.0
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+HTTP_TIMEOUT_SECONDS = 60.0
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Delay before retry number ``attempt`` (0-based): the server's
+    ``Retry-After`` seconds when given, otherwise full jitter over an
+    exponentially growing window.
+    """
+    if retry_after:
+        try:
+            return min(HTTP_BACKOFF_MAX_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form; fall back to our own schedule
+    window = min(HTTP_BACKOFF_MAX_SECONDS, HTTP_BACKOFF_SECONDS * (2 ** attempt))
+    return random.uniform(0, window)
+
+
+class ClientRegistry:
+    """
+    Lazily created clients, shared by every tool call in the process.
+    Sync clients are shared across threads (both ``requests.Session`` with
+    a pooled adapter and ``OpenAI`` are safe for that); async clients are
+    kept per event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sync: Dict[Any, Any] = {}
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._env_loaded = False
+
+    def _check_process(self) -> None:
+        # Pools inherited over fork share sockets with the parent; start over
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._sync = {}
+            self._async = weakref.WeakKeyDictionary()
+
+    def _load_env(self) -> None:
+        if not self._env_loaded:
+            dotenv.load_dotenv()
+            self._env_loaded = True
+
+    def _get_sync(self, key: Any, factory) -> Any:
+        with self._lock:
+            self._check_process()
+            self._load_env()
+            if key not in self._sync:
+                self._sync[key] = factory()
+            return self._sync[key]
+
+    def _get_async(self, key: Any, factory) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._check_process()
+            self._load_env()
+            clients = self._async.setdefault(loop, {})
+            if key not in clients:
+                clients[key] = factory()
+            return clients[key]
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    def session(self) -> requests.Session:
+        """Pooled keep-alive ``requests`` session for downloads and REST calls."""
+        def build() -> requests.Session:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            return session
+        return self._get_sync("session", build)
+
+    def http(self) -> httpx.AsyncClient:
+        """Pooled ``httpx`` client for the current event loop."""
+        return self._get_async("http", lambda: httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+        ))
+
+    def openai(self) -> OpenAI:
+        api_key = self.openai_api_key()
+        return self._get_sync(("openai", api_key), lambda: OpenAI(
+            api_key=api_key,
+            max_retries=HTTP_MAX_RETRIES,
+            http_client=httpx.Client(
+                timeout=HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+            ),
+        ))
+
+    def async_openai(self) -> AsyncOpenAI:
+        api_key = self.openai_api_key()
+        return self._get_async(("openai", api_key), lambda: AsyncOpenAI(
+            api_key=api_key,
+            max_retries=HTTP_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                timeout=HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+            ),
+        ))
+
+    def openai_api_key(self) -> Optional[str]:
+        """OPENAI_API_KEY after loading .env; check it before building a client."""
+        with self._lock:
+            self._load_env()
+        return os.getenv("OPENAI_API_KEY")
+
+    # ------------------------------------------------------------------
+    # Shutdown
+    # ------------------------------------------------------------------
+    async def aclose_loop(self) -> None:
+        """Close the async clients of the running loop before it goes away."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async.pop(loop, {})
+        for client in clients.values():
+            await client.aclose() if isinstance(client, httpx.AsyncClient) else await client.close()
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._sync = self._sync, {}
+        for client in clients.values():
+            client.close()
+
+
+# One registry per process
+clients = ClientRegistry()
+
+
+def get_with_retry(url: str, **kwargs: Any) -> Tuple[requests.Response, int]:
+    """
+    GET ``url`` on the shared session, retrying 429/5xx and connection
+    errors. Returns the final response and the number of retries it took.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT_SECONDS)
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == HTTP_MAX_RETRIES
+        try:
+            response = clients.session().get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or last_attempt:
+            return response, attempt
+        response.close()  # hand the connection back before waiting
+        time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+    raise AssertionError("unreachable")
+
+
+async def aget_with_retry(url: str, stream: bool = False, **kwargs: Any) -> Tuple[httpx.Response, int]:
+    """
+    Async ``get_with_retry`` on the event loop's shared ``httpx`` client.
+    With ``stream=True`` the body is left unread; the caller must close
+    the response.
+    """
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == HTTP_MAX_RETRIES
+        http = clients.http()
+        try:
+            response = await http.send(http.build_request("GET", url, **kwargs), stream=stream)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or last_attempt:
+            return response, attempt
+        await response.aclose()
+        await asyncio.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+    raise AssertionError("unreachable")
@@ -0,0 +1,122 @@
+"""
+Streaming, atomic, checksummed writes for downloaded assets.
+
+Bodies are streamed in ``CHUNK_SIZE`` pieces into a hidden temp file next to
+the destination while a SHA-256 is computed on the fly, then renamed into
+place. Memory stays flat however many downloads run at once, and a run that
+is killed mid-download leaves only a ``.<name>.*.tmp`` file (which the asset
+organiser ignores) instead of a truncated PNG or MP3.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, NamedTuple, Tuple
+
+from unemploymentstudios.tools.clients import aget_with_retry, get_with_retry
+
+CHUNK_SIZE = 64 * 1024
+# Multiple of 4 so every slice of a base64 string decodes on its own
+B64_CHUNK_CHARS = 4 * 16 * 1024
+
+
+class Download(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    retries: int = 0
+
+
+def _open_temp(dest: str) -> Tuple[IO[bytes], str]:
+    path = Path(dest).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    return os.fdopen(fd, "wb"), tmp_name
+
+
+def _commit(f: IO[bytes], tmp_name: str, dest: str) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp_name, Path(dest).expanduser())
+
+
+def _discard(f: IO[bytes], tmp_name: str) -> None:
+    f.close()
+    try:
+        os.unlink(tmp_name)
+    except FileNotFoundError:
+        pass
+
+
+def download_to_file(url: str, dest: str, timeout: float = 30) -> Download:
+    """Stream ``url`` into ``dest`` on the shared session (with retries)."""
+    response, retries = get_with_retry(url, stream=True, timeout=timeout)
+    with response:
+        response.raise_for_status()
+        f, tmp_name = _open_temp(dest)
+        digest, size = hashlib.sha256(), 0
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            _commit(f, tmp_name, dest)
+        except BaseException:
+            _discard(f, tmp_name)
+            raise
+    return Download(dest, digest.hexdigest(), size, retries)
+
+
+async def adownload_to_file(url: str, dest: str, timeout: float = 30) -> Download:
+    """
+    Async ``download_to_file`` on the loop's shared client. Disk writes are
+    small and buffered, so they stay on the loop; open/fsync/rename go to
+    a thread.
+    """
+    response, retries = await aget_with_retry(url, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+        f, tmp_name = await asyncio.to_thread(_open_temp, dest)
+        digest, size = hashlib.sha256(), 0
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            await asyncio.to_thread(_commit, f, tmp_name, dest)
+        except BaseException:
+            _discard(f, tmp_name)
+            raise
+    finally:
+        await response.aclose()
+    return Download(dest, digest.hexdigest(), size, retries)
+
+
+def write_b64_file(b64_data: str, dest: str) -> Download:
+    """
+    Decode a ``b64_json`` payload slice by slice into ``dest`` atomically.
+    Line breaks and other whitespace are skipped, as ``base64.decodebytes``
+    does; characters left over past a multiple of 4 carry into the next slice.
+    """
+    f, tmp_name = _open_temp(dest)
+    digest, size, carry = hashlib.sha256(), 0, ""
+    try:
+        for start in range(0, len(b64_data) + 1, B64_CHUNK_CHARS):
+            text = carry + "".join(b64_data[start:start + B64_CHUNK_CHARS].split())
+            last = start + B64_CHUNK_CHARS >= len(b64_data)
+            cut = len(text) if last else len(text) - len(text) % 4
+            text, carry = text[:cut], text[cut:]
+            chunk = base64.b64decode(text)
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            if last:
+                break
+        _commit(f, tmp_name, dest)
+    except BaseException:
+        _discard(f, tmp_name)
+        raise
+    return Download(dest, digest.hexdigest(), size)
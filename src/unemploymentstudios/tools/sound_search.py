@@ -0,0 +1,175 @@
+"""
+Freesound search and preview fetching for ``SearchAndSaveSoundTool``.
+
+Searches go through ``search_cache`` (fresh for a TTL) and previews through
+``preview_cache`` (keyed by URL), so a query like "game background music"
+costs no round trips after the first run. When duration or size constraints
+are given, the top results' previews are fetched concurrently and the
+best-ranked one that satisfies them is chosen, instead of always taking the
+first hit.
+"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from unemploymentstudios.tools.asset_cache import preview_cache, search_cache
+from unemploymentstudios.tools.clients import aget_with_retry, get_with_retry
+from unemploymentstudios.tools.downloads import adownload_to_file, download_to_file
+
+FREESOUND_API_BASE = "https://freesound.org/apiv2"
+SEARCH_FIELDS = "id,name,previews,url,duration,filesize"
+
+
+class Preview(NamedTuple):
+    sound: Dict[str, Any]
+    url: str
+    path: str
+    size: int
+    sha256: str
+    retries: int
+    cached: bool
+
+
+def api_base() -> str:
+    return os.getenv("FREESOUND_API_BASE", FREESOUND_API_BASE).rstrip("/")
+
+
+def preview_url(sound: Dict[str, Any]) -> Optional[str]:
+    previews = sound.get("previews") or {}
+    return previews.get("preview-hq-mp3") or previews.get("preview-lq-mp3")
+
+
+def _search_request(query: str, max_results: int) -> Tuple[str, Dict[str, Any]]:
+    return f"{api_base()}/search/text/", {"query": query, "fields": SEARCH_FIELDS, "page_size": max_results}
+
+
+def _staging_dir() -> Path:
+    """Where previews land when the preview cache is off."""
+    path = Path(tempfile.gettempdir()) / f"freesound-previews-{os.getpid()}"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _preview_target(url: str) -> Tuple[str, Path]:
+    key = preview_cache.make_key(url)
+    if preview_cache.enabled:
+        return key, preview_cache.blob_path(key)
+    return key, _staging_dir() / f"{key}.mp3"
+
+
+# ---------------------------------------------------------------------------
+#  Sync
+# ---------------------------------------------------------------------------
+def search(api_key: str, query: str, max_results: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """Search results, retries spent and whether they came from the cache."""
+    url, params = _search_request(query, max_results)
+    key = search_cache.make_key(url, params)
+    if search_cache.enabled:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached, 0, True
+    response, retries = get_with_retry(url, params=params, headers={"Authorization": f"Token {api_key}"}, timeout=15)
+    response.raise_for_status()
+    results = response.json().get("results", [])
+    if search_cache.enabled:
+        search_cache.put(key, results)
+    return results, retries, False
+
+
+def fetch_preview(sound: Dict[str, Any]) -> Preview:
+    url = preview_url(sound)
+    if not url:
+        raise ValueError(f"No preview audio found for sound {sound.get('id')}.")
+    key, target = _preview_target(url)
+    record = preview_cache.lookup(key) if preview_cache.enabled else None
+    if record is not None:
+        return Preview(sound, url, str(target), record["bytes"], record["sha256"], 0, True)
+    download = download_to_file(url, str(target), timeout=15)
+    if preview_cache.enabled:
+        preview_cache.commit(key, {"url": url, "sha256": download.sha256, "sound_id": sound.get("id")})
+    return Preview(sound, url, str(target), download.size, download.sha256, download.retries, False)
+
+
+def fetch_candidates(sounds: List[Dict[str, Any]]) -> List[Any]:
+    """Fetch every candidate's preview in parallel; failures come back as exceptions."""
+    def attempt(sound):
+        try:
+            return fetch_preview(sound)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, len(sounds))) as pool:
+        return list(pool.map(attempt, sounds))
+
+
+# ---------------------------------------------------------------------------
+#  Async
+# ---------------------------------------------------------------------------
+async def asearch(api_key: str, query: str, max_results: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+    url, params = _search_request(query, max_results)
+    key = search_cache.make_key(url, params)
+    if search_cache.enabled:
+        cached = await asyncio.to_thread(search_cache.get, key)
+        if cached is not None:
+            return cached, 0, True
+    response, retries = await aget_with_retry(
+        url, params=params, headers={"Authorization": f"Token {api_key}"}, timeout=15
+    )
+    response.raise_for_status()
+    results = response.json().get("results", [])
+    if search_cache.enabled:
+        await asyncio.to_thread(search_cache.put, key, results)
+    return results, retries, False
+
+
+async def afetch_preview(sound: Dict[str, Any]) -> Preview:
+    url = preview_url(sound)
+    if not url:
+        raise ValueError(f"No preview audio found for sound {sound.get('id')}.")
+    key, target = _preview_target(url)
+    record = await asyncio.to_thread(preview_cache.lookup, key) if preview_cache.enabled else None
+    if record is not None:
+        return Preview(sound, url, str(target), record["bytes"], record["sha256"], 0, True)
+    download = await adownload_to_file(url, str(target), timeout=15)
+    if preview_cache.enabled:
+        await asyncio.to_thread(
+            preview_cache.commit, key, {"url": url, "sha256": download.sha256, "sound_id": sound.get("id")}
+        )
+    return Preview(sound, url, str(target), download.size, download.sha256, download.retries, False)
+
+
+async def afetch_candidates(sounds: List[Dict[str, Any]]) -> List[Any]:
+    return await asyncio.gather(*[afetch_preview(sound) for sound in sounds], return_exceptions=True)
+
+
+# ---------------------------------------------------------------------------
+#  Selection
+# ---------------------------------------------------------------------------
+def constrained(min_duration: Optional[float], max_duration: Optional[float], max_bytes: Optional[int]) -> bool:
+    return any(limit is not None for limit in (min_duration, max_duration, max_bytes))
+
+
+def select_preview(
+    candidates: List[Any],
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> Optional[Preview]:
+    """
+    The best-ranked fetched preview that meets every constraint, falling back
+    to the best-ranked one that was fetched at all.
+    """
+    fetched = [candidate for candidate in candidates if isinstance(candidate, Preview)]
+    for preview in fetched:
+        duration = preview.sound.get("duration")
+        if min_duration is not None and (duration is None or duration < min_duration):
+            continue
+        if max_duration is not None and (duration is None or duration > max_duration):
+            continue
+        if max_bytes is not None and preview.size > max_bytes:
+            continue
+        return preview
+    return fetched[0] if fetched else None
@@ -59,6 +59,29 @@ class GameFile(BaseModel):
     content: str
     status: Literal["draft", "under_review", "approved", "needs_revision"]
 
+AssetCategory = Literal["main_character", "ui", "level", "character", "decorative"]
+
+class ImageJob(BaseModel):
+    name: str  # file stem, e.g. "main_character" -> assets/images/main_character.png
+    prompt: str
+    size: Literal["1024x1024", "1792x1024", "1024x1792"] = "1024x1024"
+    category: AssetCategory = "decorative"
+    level: Optional[int] = None  # 1-based level number for level-specific assets
+    purpose: Optional[str] = None
+
+class AudioJob(BaseModel):
+    name: str  # file stem, e.g. "jump" -> assets/audio/jump.mp3
+    query: str  # Freesound search text
+    kind: Literal["sfx", "music", "ambient", "ui"] = "sfx"
+    category: AssetCategory = "decorative"
+    level: Optional[int] = None
+    min_duration: Optional[float] = None
+    max_duration: Optional[float] = None
+
+class AssetManifest(BaseModel):
+    image_jobs: List[ImageJob] = Field(default_factory=list)
+    audio_jobs: List[AudioJob] = Field(default_factory=list)
+
 '''
 class GameFile(BaseModel):
     filename: str
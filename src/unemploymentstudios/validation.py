@@ -0,0 +1,311 @@
+"""
+Static validation of the generated game, before any LLM QA.
+
+Broken references - a script tag for a file that was never generated, an
+import of a misspelt module, a sprite path that does not exist - used to be
+found only by the QA crew or by the player. ``validate_output`` checks every
+generated file in a process pool:
+
+    html   script/stylesheet/image/media references, plus the inline
+           <script> and <style> blocks like the files below
+    js     syntax (tokens and brackets with ``js_lexer``, and ``node --check``
+           when Node.js is installed), relative imports, and string literals
+           that name asset files (``"assets/images/hero.png"``)
+    css    url() and @import references
+    json   syntax
+
+References are resolved against the generated files and everything already
+in ./Game (organised and optimised assets included). Asset paths in scripts
+are built relative to the page, so they may resolve against the game root
+or the script's own directory. Only files with problems are forwarded to the
+TestingQACrew.
+
+Settings (environment):
+    VALIDATION_WORKERS  processes (default: CPU count)
+    NODE                Node.js binary for full JS syntax checks (default: node
+                        on PATH; set to an empty string to skip them)
+"""
+import json
+import multiprocessing
+import os
+import posixpath
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+
+from unemploymentstudios.build import CSS_URL_PATTERN, DIST_DIR, resolve
+from unemploymentstudios.js_lexer import LexError, Token, match_brackets, tokenize
+from unemploymentstudios.scheduling import normalise_filename
+
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", "0")) or os.cpu_count() or 1
+NODE = os.getenv("NODE", shutil.which("node") or "")
+NODE_TIMEOUT_SECONDS = 20
+
+# Problems listed per file in the QA digest before "and N more"
+MAX_PROBLEMS_SHOWN = 5
+
+ASSET_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp", ".ico",
+                  ".mp3", ".ogg", ".wav", ".m4a", ".aac", ".webm", ".mp4",
+                  ".json", ".css", ".js", ".mjs", ".html", ".ttf", ".otf", ".woff", ".woff2"}
+ASSET_REFERENCE = re.compile(r"^[\w./-]+\.[A-Za-z0-9]+$")
+CSS_IMPORT_PATTERN = re.compile(r"""@import\s+(['"])([^'"]+)\1""")
+CSS_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+MARKDOWN_FENCE = re.compile(r"^[ \t]*```", re.MULTILINE)
+# (tag, attribute) pairs that name a file the page loads
+HTML_REFERENCES = {("script", "src"), ("link", "href"), ("img", "src"), ("audio", "src"), ("video", "src"),
+                   ("video", "poster"), ("source", "src"), ("track", "src"), ("embed", "src"),
+                   ("object", "data"), ("input", "src"), ("iframe", "src")}
+# <link rel> values whose href is not fetched from this site
+LINK_RELS_IGNORED = {"canonical", "alternate", "author", "help", "license", "next", "prev", "search",
+                     "dns-prefetch", "preconnect"}
+
+Problem = Dict[str, Any]  # {"line", "kind", "detail"}; kind is "syntax" or "missing-reference"
+
+
+class ValidationRun(NamedTuple):
+    problems: Dict[str, List[Problem]]  # {filename: problems}, failing files only
+    summary: Dict[str, Any]
+
+
+# ---------------------------------------------------------------------------
+#  Process-pool workers (module level so they can be pickled)
+# ---------------------------------------------------------------------------
+_known: FrozenSet[str] = frozenset()
+_node: str = ""
+
+
+def _init_worker(known: FrozenSet[str], node: str) -> None:
+    global _known, _node
+    _known, _node = known, node
+
+
+def _problem(line: int, kind: str, detail: str) -> Problem:
+    return {"line": line, "kind": kind, "detail": detail}
+
+
+def _check_reference(reference: str, bases: Tuple[str, ...], line: int, what: str) -> Optional[Problem]:
+    """A missing-reference problem unless ``reference`` resolves to a known file from one of ``bases``."""
+    targets = [resolve(base, reference) for base in bases]
+    if all(target is None for target in targets):
+        return None  # external, data: or fragment-only
+    if any(target in _known for target in targets if target is not None):
+        return None
+    return _problem(line, "missing-reference", f"{what} '{reference}' does not exist")
+
+
+def _module_specifiers(tokens: List[Token]) -> List[Tuple[int, str]]:
+    """(index, specifier) of every static or dynamic import and re-export."""
+    found = []
+    for index, token in enumerate(tokens):
+        if token.kind != "string" or index == 0:
+            continue
+        previous = tokens[index - 1].value
+        if previous == "from" or (previous == "import" and (index < 2 or tokens[index - 2].value != ".")) \
+                or (previous == "(" and index >= 2 and tokens[index - 2].value == "import"):
+            found.append((index, token.value[1:-1]))
+    return found
+
+
+def _node_check(source: str, module: bool) -> Optional[Problem]:
+    """Full syntax check with ``node --check``, or None if it passes or Node is unavailable."""
+    if not _node:
+        return None
+    fd, path = tempfile.mkstemp(suffix=".mjs" if module else ".js")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(source)
+        result = subprocess.run([_node, "--check", path], capture_output=True, text=True,
+                                timeout=NODE_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    finally:
+        os.unlink(path)
+    if result.returncode == 0:
+        return None
+    # "<path>:<line>\n<source line>\n<caret>\n\nSyntaxError: <message>"
+    line = re.search(rf"{re.escape(path)}:(\d+)", result.stderr)
+    message = next((text for text in result.stderr.splitlines() if "Error:" in text), "syntax error")
+    return _problem(int(line.group(1)) if line else 1, "syntax", message.strip())
+
+
+def _validate_js(source: str, path: str, first_line: int = 1, page_dir: Optional[str] = None) -> List[Problem]:
+    """
+    Problems in a script at ``path`` (relative to the game root). Inline
+    scripts pass the page's directory and the line they start on.
+    """
+    offset = first_line - 1
+    fence = MARKDOWN_FENCE.search(source)
+    if fence:  # the model wrapped its answer in a Markdown code block
+        line = source.count("\n", 0, fence.start()) + first_line
+        return [_problem(line, "syntax", "Markdown code fence in source")]
+    try:
+        tokens = tokenize(source, strict=True)
+        match_brackets(tokens, strict=True)
+    except LexError as e:
+        return [_problem(e.line + offset, "syntax", str(e).split(": ", 1)[-1])]
+    module = any(token.value in ("import", "export") and (index == 0 or tokens[index - 1].value in (";", "}"))
+                 for index, token in enumerate(tokens))
+    node_problem = _node_check(source, module)
+    problems = [dict(node_problem, line=node_problem["line"] + offset)] if node_problem else []
+
+    script_dir = posixpath.dirname(path)
+    specifiers = _module_specifiers(tokens)
+    for index, specifier in specifiers:
+        if specifier.startswith((".", "/")):
+            problem = _check_reference(specifier, (script_dir,), tokens[index].line + offset, "import")
+            if problem:
+                problems.append(problem)
+    imports = {index for index, _ in specifiers}
+    bases = (page_dir if page_dir is not None else "", script_dir)
+    for index, token in enumerate(tokens):
+        if index in imports or token.kind not in ("string", "template") or "${" in token.value:
+            continue
+        value = token.value[1:-1]
+        if ASSET_REFERENCE.match(value) and Path(value).suffix.lower() in ASSET_SUFFIXES:
+            problem = _check_reference(value, bases, token.line + offset, "file")
+            if problem:
+                problems.append(problem)
+    return problems
+
+
+def _validate_css(source: str, path: str, first_line: int = 1) -> List[Problem]:
+    # Blank out comments without changing line numbers
+    source = CSS_COMMENT_PATTERN.sub(lambda m: "\n" * m.group(0).count("\n"), source)
+    problems = []
+    for pattern, group, what in ((CSS_URL_PATTERN, 2, "url()"), (CSS_IMPORT_PATTERN, 2, "@import")):
+        for match in pattern.finditer(source):
+            line = source.count("\n", 0, match.start()) + first_line
+            problem = _check_reference(match.group(group).strip(), (posixpath.dirname(path),), line, what)
+            if problem:
+                problems.append(problem)
+    return problems
+
+
+class _PageParser(HTMLParser):
+    def __init__(self, path: str):
+        super().__init__(convert_charrefs=True)
+        self.path, self.page_dir = path, posixpath.dirname(path)
+        self.problems: List[Problem] = []
+        self._inline: Optional[Tuple[str, Dict[str, Optional[str]], int]] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = {name.lower(): value for name, value in attrs}
+        line = self.getpos()[0]
+        rel = set((attributes.get("rel") or "").lower().split())
+        for (ref_tag, attribute) in HTML_REFERENCES:
+            value = attributes.get(attribute)
+            if tag != ref_tag or not value or (tag == "link" and rel & LINK_RELS_IGNORED):
+                continue
+            problem = _check_reference(value, (self.page_dir,), line, f"<{tag} {attribute}>")
+            if problem:
+                self.problems.append(problem)
+        if tag == "style" or (tag == "script" and not attributes.get("src")):
+            self._inline, self._text = (tag, attributes, line), []
+        if "style" in attributes and attributes["style"]:
+            self.problems += _validate_css(attributes["style"], self.path, line)
+
+    def handle_data(self, data: str) -> None:
+        if self._inline is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._inline is None or tag != self._inline[0]:
+            return
+        _, attributes, line = self._inline
+        text = "".join(self._text)
+        self._inline = None
+        if tag == "style":
+            self.problems += _validate_css(text, self.path, line)
+        elif (attributes.get("type") or "text/javascript").lower() in ("text/javascript", "module",
+                                                                       "application/javascript"):
+            self.problems += _validate_js(text, self.path, line, page_dir=self.page_dir)
+
+
+def validate_file(path: str, source: str) -> List[Problem]:
+    """Problems in one generated file; ``path`` is relative to the game root."""
+    suffix = Path(path).suffix.lower()
+    if suffix in (".js", ".mjs"):
+        problems = _validate_js(source, path)
+    elif suffix == ".css":
+        problems = _validate_css(source, path)
+    elif suffix in (".html", ".htm"):
+        parser = _PageParser(path)
+        parser.feed(source)
+        parser.close()
+        problems = parser.problems
+    elif suffix == ".json":
+        try:
+            json.loads(source)
+            problems = []
+        except ValueError as e:
+            problems = [_problem(getattr(e, "lineno", 1), "syntax", str(e))]
+    else:
+        problems = []
+    return sorted(problems, key=lambda problem: problem["line"])
+
+
+# ---------------------------------------------------------------------------
+#  Stage
+# ---------------------------------------------------------------------------
+def known_files(code_files: Dict[str, str], game_dir: Union[str, Path]) -> FrozenSet[str]:
+    """Generated file names plus every file already under ``game_dir`` (except the build)."""
+    known = {normalise_filename(name) for name in code_files}
+    game_dir = Path(game_dir)
+    for root, dirs, names in os.walk(game_dir):
+        relative_root = Path(root).relative_to(game_dir).as_posix()
+        dirs[:] = [d for d in dirs if not d.startswith(".") and not (relative_root == "." and d == DIST_DIR)]
+        known.update(posixpath.normpath(posixpath.join(relative_root, name)) for name in names)
+    return frozenset(known)
+
+
+def validate_output(
+    code_files: Dict[str, str],
+    game_dir: Union[str, Path] = "./Game",
+    workers: Optional[int] = None,
+) -> ValidationRun:
+    """Validate every file in ``code_files`` ({filename: content}) against ``game_dir``."""
+    known = known_files(code_files, game_dir)
+    names = sorted(code_files)
+    problems: Dict[str, List[Problem]] = {}
+    if names:
+        # spawn: the flow is threaded, and a forked child can deadlock on locks held at fork time
+        with ProcessPoolExecutor(max_workers=max(1, min(workers or VALIDATION_WORKERS, len(names))),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(known, NODE)) as pool:
+            results = pool.map(validate_file, [normalise_filename(name) for name in names],
+                               [code_files[name] for name in names])
+            for name, found in zip(names, results):
+                if found:
+                    problems[name] = found
+    all_problems = [problem for found in problems.values() for problem in found]
+    summary = {
+        "files": len(names),
+        "failing": len(problems),
+        "syntax_errors": sum(1 for problem in all_problems if problem["kind"] == "syntax"),
+        "missing_references": sum(1 for problem in all_problems if problem["kind"] == "missing-reference"),
+        "node": bool(NODE),
+    }
+    return ValidationRun(problems, summary)
+
+
+def format_problems(problems: Dict[str, List[Problem]], max_files: Optional[int] = None) -> str:
+    """
+    Plain-text digest of the failing files, for the QA crew's prompt; with
+    ``max_files``, only that many files are listed.
+    """
+    if not problems:
+        return "Every file passed static validation."
+    lines = []
+    for name, found in sorted(problems.items())[:max_files]:
+        shown = "; ".join(f"line {problem['line']}: {problem['detail']}" for problem in found[:MAX_PROBLEMS_SHOWN])
+        more = f"; and {len(found) - MAX_PROBLEMS_SHOWN} more" if len(found) > MAX_PROBLEMS_SHOWN else ""
+        lines.append(f"- {name}: {shown}{more}")
+    if max_files is not None and len(problems) > max_files:
+        lines.append(f"- ... and {len(problems) - max_files} more failing files")
+    return "\n".join(lines)